@@ -0,0 +1,9 @@
+"""Офлайн-бенчмарк движка HHSearch.
+
+Запускает настоящий конвейер (hhsearch.engine) против локальной замены API hh.ru
+и генератора писем без обращения к Gemini:
+
+    python -m bench.run --corpus 2000 --hh-latency-ms 80 --llm-latency-ms 800
+
+Подробности параметров: python -m bench.run --help
+"""
@@ -0,0 +1,192 @@
+"""Локальная замена API hh.ru для бенчмарка.
+
+Сервер отдает детерминированный корпус вакансий и поддерживает те запросы, которые
+делает движок: /vacancies, /vacancies/{id}, /resumes/mine, /resumes/{id} и POST
+/negotiations. Задержка ответов, доля ошибок 5xx и ответов 429 настраиваются.
+По адресу /_stats отдается число обработанных запросов по видам.
+"""
+import json
+import math
+import time
+import random
+import threading
+import http.server
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse, parse_qs
+
+TITLES = ["Python-разработчик", "Backend-разработчик", "Разработчик Django", "Data Engineer",
+          "Инженер по автоматизации", "Fullstack-разработчик", "PHP-разработчик", "Разработчик 1С"]
+VOCABULARY = ("flask fastapi postgresql redis docker kubernetes linux git celery rabbitmq kafka sql rest api "
+              "микросервисы тестирование команда проект разработка поддержка опыт задачи требования "
+              "условия офис удаленно график зарплата java golang").split()
+# Слова стека по названию вакансии: так в корпусе есть и подходящие вакансии, и отсеиваемые стоп-словами
+TITLE_WORDS = {"PHP-разработчик": ["php", "bitrix", "laravel"], "Разработчик 1С": ["1с", "bitrix"],
+               "Разработчик Django": ["python", "django"], "Python-разработчик": ["python", "django"]}
+RESUME_ID = "bench-resume"
+# Ограничение hh.ru: в выдаче поиска доступно не больше 2000 вакансий
+MAX_SEARCH_RESULTS = 2000
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+
+def build_corpus(size, seed=0):
+    """Генерирует корпус вакансий, отсортированный от новых к старым."""
+    rng = random.Random(seed)
+    # Корпус публикуется "только что": отложенные при отборе вакансии не устаревают (RANKING_DEFERRED_DAYS)
+    newest = datetime.now(timezone(timedelta(hours=3))).replace(second=0, microsecond=0)
+    corpus = []
+    for index in range(size):
+        vacancy_id = str(100000 + index)
+        employer_id = str(rng.randrange(max(1, size // 5)))
+        salary_from = rng.choice([None, 80000, 120000, 150000, 200000, 250000])
+        name = rng.choice(TITLES)
+        words = rng.choices(VOCABULARY + TITLE_WORDS.get(name, ["python"]) * 3, k=rng.randint(80, 300))
+        description = "".join(f"<p>{' '.join(words[i:i + 15])}</p>" for i in range(0, len(words), 15))
+        corpus.append({
+            'id': vacancy_id,
+            'name': name,
+            'employer': {'id': employer_id, 'name': f"Компания {employer_id}"},
+            'salary': {'from': salary_from, 'to': None, 'currency': 'RUR'} if salary_from else None,
+            'published_at': (newest - timedelta(minutes=index)).strftime("%Y-%m-%dT%H:%M:%S%z"),
+            'alternate_url': f"https://hh.ru/vacancy/{vacancy_id}",
+            'snippet': {'requirement': ' '.join(words[:12]), 'responsibility': ' '.join(words[12:24])},
+            'description': description,
+        })
+    return corpus
+
+class FakeHHServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, options):
+        super().__init__(address, FakeHHHandler)
+        self.options = options
+        self.corpus = build_corpus(options['corpus'], options['seed'])
+        self.by_id = {vacancy['id']: vacancy for vacancy in self.corpus}
+        self.published = [parse_date(vacancy['published_at']) for vacancy in self.corpus]
+        self.rng = random.Random(options['seed'])
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def count(self, kind):
+        with self.lock:
+            self.stats[kind] = self.stats.get(kind, 0) + 1
+
+    def roll(self, rate):
+        with self.lock:
+            return self.rng.random() < rate
+
+class FakeHHHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        return
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate(self, kind):
+        """Задержка и случайные сбои. Возвращает True, если ответ уже отправлен (ошибка)."""
+        options = self.server.options
+        self.server.count(kind)
+        delay = options['latency_ms'] + random.uniform(0, options['jitter_ms'])
+        time.sleep(delay / 1000)
+        if self.server.roll(options['rate_limit_rate']):
+            self.server.count('429')
+            self.send_json(429, {'errors': [{'type': 'too_many_requests'}]}, {'Retry-After': str(options['retry_after'])})
+            return True
+        if self.server.roll(options['error_rate']):
+            self.server.count('5xx')
+            self.send_json(503, {'errors': [{'type': 'service_unavailable'}]})
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/_stats':
+            with self.server.lock:
+                self.send_json(200, dict(self.server.stats))
+            return
+        if url.path == '/vacancies':
+            if not self.simulate('search'):
+                self.send_json(200, self.search(query))
+            return
+        if url.path.startswith('/vacancies/'):
+            if self.simulate('vacancy_details'):
+                return
+            vacancy = self.server.by_id.get(url.path.rsplit('/', 1)[1])
+            if vacancy is None:
+                self.send_json(404, {'errors': [{'type': 'not_found'}]})
+            else:
+                self.send_json(200, vacancy, {'ETag': f'"{vacancy["id"]}"'})
+            return
+        if url.path == '/resumes/mine':
+            if not self.simulate('resumes'):
+                self.send_json(200, {'items': [{'id': RESUME_ID, 'title': 'Python-разработчик'}]})
+            return
+        if url.path.startswith('/resumes/'):
+            if not self.simulate('resumes'):
+                self.send_json(200, {
+                    'id': RESUME_ID,
+                    'title': 'Python-разработчик',
+                    'updated_at': '2026-01-01T00:00:00+0300',
+                    'key_skills': [{'name': 'Python'}, {'name': 'Django'}, {'name': 'PostgreSQL'}],
+                    'experience': [],
+                })
+            return
+        self.send_json(404, {'errors': [{'type': 'not_found'}]})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        if urlparse(self.path).path != '/negotiations':
+            self.send_json(404, {'errors': [{'type': 'not_found'}]})
+            return
+        if not self.simulate('negotiations'):
+            self.send_response(201)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def search(self, query):
+        """Выдача поиска: фильтр по date_from и постраничная разбивка, как у hh.ru."""
+        per_page = int(query.get('per_page', ['20'])[0])
+        page = int(query.get('page', ['0'])[0])
+        items = self.server.corpus
+        if 'date_from' in query:
+            date_from = parse_date(query['date_from'][0])
+            items = [v for v, published in zip(items, self.server.published) if published >= date_from]
+        available = items[:MAX_SEARCH_RESULTS]
+        page_items = [{key: value for key, value in vacancy.items() if key != 'description'}
+                      for vacancy in available[page * per_page:(page + 1) * per_page]]
+        return {
+            'items': page_items,
+            'found': len(items),
+            'pages': math.ceil(len(available) / per_page),
+            'page': page,
+            'per_page': per_page,
+        }
+
+def serve(options, ready):
+    server = FakeHHServer(("127.0.0.1", 0), options)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+def start_fake_hh(options):
+    """Запускает сервер в отдельном процессе, чтобы он не влиял на замер памяти и CPU движка.
+
+    Возвращает (процесс, базовый URL).
+    """
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(options, ready), daemon=True)
+    process.start()
+    port = ready.get(timeout=30)
+    return process, f"http://127.0.0.1:{port}"
@@ -0,0 +1,44 @@
+"""Замена генератора писем для бенчмарка: без сети и без расхода квоты Gemini."""
+import time
+import random
+import threading
+
+from hhsearch import metrics
+from hhsearch.llm import GenerationScheduler
+
+class FakeCoverLetterGenerator:
+    """Имитирует CoverLetterGenerator: та же сигнатура generate/close, задержка и доля ошибок настраиваются.
+
+    Квоты RPM/TPM соблюдаются настоящим GenerationScheduler, поэтому бенчмарк
+    показывает и ожидание квоты, если она задана.
+    """
+
+    def __init__(self, latency_ms=800, jitter_ms=400, error_rate=0.0, rpm=10000, tpm=10_000_000, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.scheduler = GenerationScheduler(rpm=rpm, tpm=tpm)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    @metrics.instrumented("cover_letter")
+    def generate(self, vacancy, resume_data=None, stop_event=None):
+        prompt = f"{vacancy['name']}\n{vacancy['employer_name']}\n{vacancy['prompt_text']}"
+        quota = self.scheduler.acquire(self.scheduler.estimate_tokens(prompt), stop_event)
+        if quota is None:
+            return None
+        with self.lock:
+            delay = (self.latency_ms + self.rng.uniform(0, self.jitter_ms)) / 1000
+            failed = self.rng.random() < self.error_rate
+        if stop_event is not None:
+            if stop_event.wait(delay):
+                return None
+        else:
+            time.sleep(delay)
+        if failed:
+            return None
+        metrics.registry.add('llm_tokens', quota[1])
+        return f"Здравствуйте! Меня заинтересовала вакансия «{vacancy['name']}» в компании {vacancy['employer_name']}."
+
+    def close(self):
+        pass
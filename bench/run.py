@@ -0,0 +1,168 @@
+"""Запуск бенчмарка: поднимает локальный hh.ru, прогоняет циклы движка и печатает отчет."""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import urllib.request
+
+from .fake_hh import RESUME_ID, start_fake_hh
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Операции движка в порядке этапов конвейера
+OPERATIONS = ("search", "vacancy_details", "filter", "cover_letter", "apply")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк движка HHSearch")
+    parser.add_argument("--corpus", type=int, default=1000, help="число вакансий на фейковом hh.ru")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора корпуса и сбоев")
+    parser.add_argument("--cycles", type=int, default=1, help="число циклов поиска подряд (со второго работают кэши)")
+    parser.add_argument("--search-depth", type=int, default=20, help="глубина поиска в страницах")
+    parser.add_argument("--keyword", default="python, django", help="ключевые слова профиля")
+    parser.add_argument("--exclude", default="php, 1с, bitrix", help="стоп-слова профиля")
+    parser.add_argument("--min-keywords", type=int, default=1)
+    parser.add_argument("--match-mode", default="word", choices=["substring", "word", "prefix", "stem"])
+    parser.add_argument("--hh-latency-ms", type=float, default=50, help="базовая задержка ответа hh.ru")
+    parser.add_argument("--hh-jitter-ms", type=float, default=50, help="случайная добавка к задержке hh.ru")
+    parser.add_argument("--hh-error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--hh-429-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--hh-retry-after", type=int, default=1, help="Retry-After в ответах 429, секунд")
+    parser.add_argument("--hh-rps", type=float, default=50, help="ограничение частоты запросов движка к hh.ru")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="базовая задержка генерации письма")
+    parser.add_argument("--llm-jitter-ms", type=float, default=400, help="случайная добавка к задержке LLM")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="доля неудачных генераций")
+    parser.add_argument("--llm-rpm", type=int, default=10000, help="квота LLM, запросов в минуту")
+    parser.add_argument("--llm-tpm", type=int, default=10_000_000, help="квота LLM, токенов в минуту")
+    parser.add_argument("--top-n", type=int, default=0, help="откликов за цикл после отбора кандидатов (0 - все)")
+    parser.add_argument("--daily-budget", type=int, default=0, help="суточный бюджет откликов (0 - без ограничения)")
+    parser.add_argument("--apply-delay", type=float, default=0, help="пауза между откликами, секунд")
+    parser.add_argument("--log-level", default="WARNING", help="уровень логирования движка во время замера")
+    parser.add_argument("--tracemalloc", action="store_true", help="считать пик памяти Python-объектов (замедляет работу)")
+    parser.add_argument("--json", help="сохранить результаты в JSON-файл для сравнения прогонов")
+    return parser.parse_args(argv)
+
+def fetch_server_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/_stats", timeout=10) as response:
+        return json.load(response)
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS - в байтах
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_benchmark(args):
+    server_options = {
+        'corpus': args.corpus,
+        'seed': args.seed,
+        'latency_ms': args.hh_latency_ms,
+        'jitter_ms': args.hh_jitter_ms,
+        'error_rate': args.hh_error_rate,
+        'rate_limit_rate': args.hh_429_rate,
+        'retry_after': args.hh_retry_after,
+    }
+    server_process, base_url = start_fake_hh(server_options)
+    workdir = tempfile.TemporaryDirectory(prefix="hhsearch-bench-")
+    previous_cwd = os.getcwd()
+    try:
+        # Конфигурация движка читается из окружения при импорте, поэтому пакет
+        # импортируется только после подмены адреса API и рабочего каталога
+        os.chdir(workdir.name)
+        os.environ.update({
+            'HH_API_URL': base_url,
+            'HH_REQUESTS_PER_SECOND': str(args.hh_rps),
+            'APPLY_DELAY': str(args.apply_delay),
+            'RANKING_TOP_N': str(args.top_n),
+            'DAILY_APPLY_BUDGET': str(args.daily_budget),
+            'LOG_LEVEL': args.log_level,
+            'METRICS_PORT': '0',
+        })
+        from hhsearch import api, config, engine, metrics
+        from .fake_llm import FakeCoverLetterGenerator
+
+        config.setup_logging()
+        api.set_access_token("bench")
+        settings = dict(config.DEFAULT_SETTINGS,
+                        keyword=args.keyword,
+                        exclude_keyword=args.exclude,
+                        resume=f"Бенчмарк ({RESUME_ID})",
+                        min_keywords=str(args.min_keywords),
+                        search_depth=str(args.search_depth),
+                        match_mode=args.match_mode)
+
+        if args.tracemalloc:
+            tracemalloc.start()
+        cycles = []
+        started = time.perf_counter()
+        for _ in range(args.cycles):
+            generator = FakeCoverLetterGenerator(args.llm_latency_ms, args.llm_jitter_ms, args.llm_error_rate,
+                                                 args.llm_rpm, args.llm_tpm, args.seed)
+            engine.run_engine([settings], once=True, generator=generator)
+            cycles.append(metrics.registry.summary()['last_cycle'])
+        elapsed = time.perf_counter() - started
+
+        summary = metrics.registry.summary()
+        totals = summary['totals']
+        return {
+            'options': vars(args),
+            'elapsed': elapsed,
+            'vacancies_per_second': totals['seen'] / elapsed if elapsed else 0.0,
+            'processed_per_second': (totals['seen'] - totals['known']) / elapsed if elapsed else 0.0,
+            'applied_per_second': totals['applied'] / elapsed if elapsed else 0.0,
+            'totals': totals,
+            'cycles': cycles,
+            'operations': {name: summary['operations'][name] for name in OPERATIONS if name in summary['operations']},
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_traced_mb': tracemalloc.get_traced_memory()[1] / (1024 * 1024) if args.tracemalloc else None,
+            'server_requests': fetch_server_stats(base_url),
+        }
+    finally:
+        os.chdir(previous_cwd)
+        server_process.terminate()
+        # На Windows база SQLite может быть еще открыта, временный каталог тогда остается
+        try:
+            workdir.cleanup()
+        except OSError:
+            pass
+
+def print_report(result):
+    totals = result['totals']
+    print(f"Время: {result['elapsed']:.2f} с, циклов: {len(result['cycles'])}")
+    print(f"Вакансий просмотрено: {totals['seen']} ({result['vacancies_per_second']:.1f}/с), "
+          f"новых обработано: {totals['seen'] - totals['known']} ({result['processed_per_second']:.1f}/с)")
+    print(f"Отклонено: {totals['rejected']}, отложено: {totals['deferred']}, откликов: {totals['applied']} ({result['applied_per_second']:.2f}/с), "
+          f"ошибок отклика: {totals['apply_failed']}, токенов LLM: {totals['llm_tokens']}")
+    for index, cycle in enumerate(result['cycles'], 1):
+        print(f"  цикл {index}: {cycle['duration']:.2f} с, просмотрено {cycle['seen']}, известно {cycle['known']}, "
+              f"откликов {cycle['applied']}")
+    print()
+    print(f"{'Операция':<16}{'число':>8}{'ошибок':>8}{'p50, мс':>10}{'p95, мс':>10}{'сред., мс':>11}")
+    for name, stats in result['operations'].items():
+        print(f"{name:<16}{stats['count']:>8}{stats['errors']:>8}{stats['p50'] * 1000:>10.1f}"
+              f"{stats['p95'] * 1000:>10.1f}{stats['avg'] * 1000:>11.1f}")
+    print("(p50/p95 оцениваются по корзинам гистограммы)")
+    print()
+    if result['peak_rss_mb'] is not None:
+        print(f"Пик памяти процесса (RSS): {result['peak_rss_mb']:.1f} МБ")
+    if result['peak_traced_mb'] is not None:
+        print(f"Пик памяти Python-объектов (tracemalloc): {result['peak_traced_mb']:.1f} МБ")
+    print("Запросы к фейковому hh.ru: " + ", ".join(f"{kind} {count}" for kind, count in sorted(result['server_requests'].items())))
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = run_benchmark(args)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""HHSearch - автоматический поиск вакансий на hh.ru и отклик с письмом от LLM.
+
+Движок (поиск, фильтрация, генерация писем, отклики) не зависит от tkinter и
+может работать как из графического интерфейса, так и в режиме без GUI.
+"""
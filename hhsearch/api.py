@@ -0,0 +1,462 @@
+import logging
+import threading
+import time
+import requests
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import config
+from . import metrics
+from .llm import format_resume_for_prompt
+from .storage import APPLY_SUCCESS_REASON, get_resume_cache, get_vacancy_cache, load_token_file, save_token_file
+
+access_token = None
+
+# Ответы, после которых hh.ru просит снизить частоту запросов
+THROTTLE_STATUSES = (429, 503)
+
+class RequestCancelled(requests.exceptions.RequestException):
+    """Ожидание разрешения на запрос прервано сигналом остановки."""
+
+# --- Планировщик запросов к hh.ru ---
+class AdaptiveRateLimiter:
+    """Token bucket одного класса запросов со скоростью, которая подстраивается под ответы hh.ru (AIMD).
+
+    Успешный ответ увеличивает скорость на долю increase от max_rate, ответ 429/503
+    умножает ее на decrease (до min_rate) и приостанавливает класс на время из Retry-After.
+    """
+
+    def __init__(self, name, rate, min_rate, max_rate, increase=config.HH_RATE_INCREASE, decrease=config.HH_RATE_DECREASE):
+        self.name = name
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, stop_event=None):
+        """Ждет свободный токен. Возвращает False, если ожидание прервано stop_event."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait_time = self.blocked_until - now
+                else:
+                    capacity = max(1.0, self.rate)
+                    self.tokens = min(capacity, self.tokens + (now - max(self.updated, self.blocked_until)) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return True
+                    wait_time = (1 - self.tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(wait_time):
+                    return False
+            else:
+                time.sleep(wait_time)
+
+    def success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.increase)
+
+    def throttle(self, status_code, retry_after):
+        """Ответ 429/503: снижает скорость и приостанавливает класс на retry_after секунд."""
+        with self.lock:
+            now = time.monotonic()
+            # Ответы на запросы, отправленные до начала паузы, скорость повторно не снижают
+            if now >= self.blocked_until:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            # Накопленные токены сгорают, чтобы после паузы не отправить пачку запросов разом
+            self.tokens = 0.0
+            self.throttled += 1
+            rate = self.rate
+        logging.warning(f"hh.ru ответил {status_code} на запрос класса {self.name}: пауза {retry_after:.0f} с, "
+                        f"скорость снижена до {rate:.2f} запр/с.")
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'rate': self.rate,
+                'blocked_for': max(0.0, self.blocked_until - time.monotonic()),
+                'throttled': self.throttled,
+            }
+
+class RequestScheduler:
+    """Общий планировщик запросов к hh.ru: отдельный адаптивный ограничитель на каждый класс запросов."""
+
+    def __init__(self, limits=config.HH_RATE_LIMITS):
+        self.limiters = {
+            name: AdaptiveRateLimiter(name, limit['rate'], limit['min'], limit['max'])
+            for name, limit in limits.items()
+        }
+
+    def limiter(self, endpoint):
+        return self.limiters.get(endpoint) or self.limiters['other']
+
+    def snapshot(self):
+        """Состояние ограничителей для логов, GUI и метрик: {класс: {rate, blocked_for, throttled}}."""
+        return {name: limiter.snapshot() for name, limiter in self.limiters.items()}
+
+    def describe(self):
+        parts = []
+        for name, state in self.snapshot().items():
+            part = f"{name} {state['rate']:.2f}/с"
+            if state['blocked_for']:
+                part += f" (пауза {state['blocked_for']:.0f} с)"
+            parts.append(part)
+        return ", ".join(parts)
+
+def parse_retry_after(response, default=config.HH_THROTTLE_DELAY):
+    """Пауза из заголовка Retry-After (секунды или HTTP-дата), иначе default."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+# --- Клиент API hh.ru ---
+class HHApiClient:
+    """Общий клиент API hh.ru: пул keep-alive соединений, таймауты и повторы с экспоненциальной задержкой."""
+
+    def __init__(self, base_url=config.HH_API_URL, connect_timeout=config.HH_CONNECT_TIMEOUT, read_timeout=config.HH_READ_TIMEOUT,
+                 max_retries=config.HH_MAX_RETRIES, backoff_factor=config.HH_BACKOFF_FACTOR, pool_size=config.HH_POOL_SIZE,
+                 scheduler=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.scheduler = scheduler or RequestScheduler()
+        # Ошибки соединения повторяются для любых методов (запрос не ушел на сервер),
+        # ответы 5xx и обрывы чтения - только для идемпотентных GET, чтобы не продублировать отклик.
+        # 429 и 503 обрабатывает планировщик в request(): они замедляют весь класс запросов.
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 504),
+            allowed_methods=frozenset({'GET'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = 'HHSearch/1.0'
+        # Менеджер токенов OAuth (см. OAuthTokens): обновляет токен до истечения срока и после 401/403
+        self.auth = None
+
+    def set_token(self, token):
+        """Один раз прописывает заголовок Authorization для всех последующих запросов."""
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+        else:
+            self.session.headers.pop('Authorization', None)
+
+    def request(self, method, path, endpoint='other', stop_event=None, **kwargs):
+        """Запрос с разрешения планировщика для класса endpoint.
+
+        После 429/503 запрос повторяется, когда класс снова разрешит его (для POST - только
+        после 429: такой запрос сервер точно не выполнил). Если ожидание прервано stop_event,
+        выбрасывается RequestCancelled.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        limiter = self.scheduler.limiter(endpoint)
+        throttled = 0
+        token_refreshed = False
+        while True:
+            if not limiter.acquire(stop_event):
+                raise RequestCancelled(f"Запрос {method} {path} отменен: получен сигнал остановки.")
+            if self.auth is not None:
+                self.auth.ensure_fresh()
+            authorization = self.session.headers.get('Authorization')
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            if response.status_code in THROTTLE_STATUSES:
+                limiter.throttle(response.status_code, parse_retry_after(response))
+                if throttled < self.max_retries and (method == 'GET' or response.status_code == 429):
+                    throttled += 1
+                    response.close()
+                    continue
+                return response
+            limiter.success()
+            # Токен отозван или истек раньше срока: обновляем его и повторяем запрос один раз
+            if self.auth is not None and authorization and not token_refreshed and is_token_error(response):
+                token_refreshed = True
+                if self.auth.refresh(authorization):
+                    response.close()
+                    continue
+            return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+def is_token_error(response):
+    """401 или 403 с ошибкой типа oauth: проблема в токене, а не в правах на конкретное действие."""
+    if response.status_code == 401:
+        return True
+    if response.status_code != 403:
+        return False
+    try:
+        errors = response.json().get('errors', [])
+    except ValueError:
+        return False
+    return any(error.get('type') == 'oauth' for error in errors)
+
+hh_client = HHApiClient()
+metrics.registry.rate_limits = hh_client.scheduler.snapshot
+
+# --- Функции для работы с резюме ---
+def get_resume_details(resume_id, stop_event=None):
+    """Данные резюме: в пределах RESUME_CACHE_TTL_HOURS из дискового кэша без обращения к hh.ru.
+
+    В поле prompt_text лежит готовый текст резюме для промпта LLM. Он пересобирается
+    только при изменении updated_at резюме на hh.ru. Если hh.ru недоступен,
+    возвращается устаревшая копия из кэша.
+    """
+    resume_cache = get_resume_cache()
+    cached = resume_cache.get(resume_id)
+    if cached and cached['fresh']:
+        logging.info(f"Используем кэшированные данные резюме {resume_id}")
+        return cached['data']
+    if not access_token:
+        logging.error("Токен доступа не найден")
+        return cached['data'] if cached else None
+    try:
+        response = hh_client.get(f'/resumes/{resume_id}', stop_event=stop_event)
+        response.raise_for_status()
+        resume_data = response.json()
+    except RequestCancelled:
+        return cached['data'] if cached else None
+    except requests.exceptions.RequestException as e:
+        if cached:
+            logging.warning(f"Не удалось обновить данные резюме {resume_id}, используем сохраненную копию: {e}")
+            return cached['data']
+        logging.error(f"Не удалось получить данные резюме {resume_id}: {e}")
+        return None
+    if cached and cached['updated_at'] == resume_data.get('updated_at'):
+        resume_cache.touch(resume_id)
+        logging.info(f"Резюме {resume_id} не менялось, используем сохраненные данные.")
+        return cached['data']
+    if cached:
+        logging.info(f"Резюме {resume_id} изменено на hh.ru, обновляю данные для писем.")
+    prompt_text = format_resume_for_prompt(resume_data)
+    resume_cache.put(resume_id, resume_data, prompt_text)
+    logging.info(f"Успешно загружены данные резюме {resume_id}")
+    return dict(resume_data, prompt_text=prompt_text)
+
+# --- Токены OAuth ---
+class OAuthTokens:
+    """Токены OAuth hh.ru с сохранением на диск и автоматическим обновлением.
+
+    Токен обновляется перед запросом, если до истечения срока осталось меньше
+    TOKEN_REFRESH_MARGIN_SECONDS, и после ответа 401/403 с ошибкой oauth.
+    Обновление выполняется под блокировкой, поэтому параллельные запросы не
+    тратят refresh_token повторно.
+    """
+
+    # Пауза перед повторной попыткой, если hh.ru отказал в обновлении
+    RETRY_DELAY = 60
+
+    def __init__(self, path=config.TOKEN_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.refresh_token = None
+        self.expires_at = None
+        self.next_attempt = 0
+
+    def load(self):
+        """Восстанавливает токены с диска. Возвращает True, если есть действующий токен доступа."""
+        tokens = load_token_file(self.path)
+        if not tokens or not tokens.get('access_token'):
+            return False
+        with self.lock:
+            self.refresh_token = tokens.get('refresh_token')
+            self.expires_at = tokens.get('expires_at')
+        set_access_token(tokens['access_token'])
+        logging.info(f"Токен доступа загружен из файла {self.path}.")
+        self.ensure_fresh()
+        # Истекший токен, который не удалось обновить, бесполезен: нужна новая авторизация
+        return self.expires_at is None or self.expires_at > time.time()
+
+    def update(self, token_data):
+        """Принимает ответ /oauth/token, применяет новый токен и сохраняет его на диск."""
+        expires_in = token_data.get('expires_in')
+        self.refresh_token = token_data.get('refresh_token') or self.refresh_token
+        self.expires_at = time.time() + expires_in if expires_in else None
+        set_access_token(token_data['access_token'])
+        try:
+            save_token_file({'access_token': access_token, 'refresh_token': self.refresh_token,
+                             'expires_at': self.expires_at}, self.path)
+        except OSError:
+            logging.exception(f"Не удалось сохранить токены в файл {self.path}.")
+
+    def ensure_fresh(self):
+        if self.expires_at is not None and self.expires_at - time.time() < config.TOKEN_REFRESH_MARGIN_SECONDS:
+            self.refresh()
+
+    def refresh(self, failed_authorization=None):
+        """Обновляет токен по refresh_token. Возвращает True, если можно повторить запрос с новым токеном."""
+        with self.lock:
+            # Пока ждали блокировку, токен уже обновил другой поток
+            if failed_authorization and hh_client.session.headers.get('Authorization') != failed_authorization:
+                return True
+            if not self.refresh_token or time.monotonic() < self.next_attempt:
+                return False
+            try:
+                response = requests.post(config.HH_OAUTH_TOKEN_URL, timeout=hh_client.timeout, data={
+                    'grant_type': 'refresh_token',
+                    'refresh_token': self.refresh_token,
+                })
+                if response.status_code == 400 and 'token not expired' in response.text:
+                    # hh.ru обновляет токен только после истечения срока: продолжаем со старым
+                    # и переносим срок, чтобы не повторять попытку перед каждым запросом
+                    self.expires_at = time.time() + config.TOKEN_REFRESH_MARGIN_SECONDS + self.RETRY_DELAY
+                    return False
+                response.raise_for_status()
+                self.update(response.json())
+            except (requests.exceptions.RequestException, ValueError, KeyError):
+                logging.exception("Не удалось обновить токен доступа hh.ru.")
+                self.next_attempt = time.monotonic() + self.RETRY_DELAY
+                return False
+        logging.info("Токен доступа hh.ru обновлен.")
+        return True
+
+oauth_tokens = OAuthTokens()
+hh_client.auth = oauth_tokens
+
+# --- Функции для работы с API hh.ru ---
+def set_access_token(token):
+    global access_token
+    access_token = token
+    hh_client.set_token(token)
+
+def get_access_token(auth_code):
+    """Обменивает код авторизации OAuth на токены и сохраняет их. Исключения requests пробрасываются вызывающему."""
+    logging.info("Обмен кода авторизации на токен доступа.")
+    data = {
+        'grant_type': 'authorization_code',
+        'client_id': config.HH_CLIENT_ID,
+        'client_secret': config.HH_CLIENT_SECRET,
+        'code': auth_code,
+        'redirect_uri': config.HH_REDIRECT_URI
+    }
+    response = requests.post(config.HH_OAUTH_TOKEN_URL, data=data, timeout=hh_client.timeout)
+    response.raise_for_status()
+    oauth_tokens.update(response.json())
+    logging.info("Токен доступа успешно получен.")
+    return access_token
+
+def restore_access_token():
+    """Берет сохраненный токен (обновляя его при необходимости). Возвращает True, если авторизация не нужна."""
+    return oauth_tokens.load()
+
+def get_resumes():
+    """Возвращает словарь {"Название (id)": id} резюме пользователя или None при ошибке."""
+    if not access_token: return None
+    try:
+        response = hh_client.get('/resumes/mine')
+        response.raise_for_status()
+        resumes_data = response.json().get('items', [])
+        resumes = {f"{r['title']} ({r['id']})": r['id'] for r in resumes_data}
+        logging.info(f"Загружено {len(resumes)} резюме.")
+        return resumes
+    except requests.exceptions.RequestException:
+        logging.exception("Ошибка при загрузке резюме.")
+        return None
+
+@metrics.instrumented("search")
+def search_vacancies(params, on_error=None, stop_event=None):
+    try:
+        response = hh_client.get('/vacancies', endpoint='search', stop_event=stop_event, params=params)
+        response.raise_for_status()
+        return response.json()
+    except RequestCancelled:
+        return None
+    except requests.exceptions.RequestException as e:
+        logging.exception("Ошибка при поиске вакансий.")
+        if on_error:
+            on_error(f"Ошибка при поиске вакансий: {e}")
+        return None
+
+def get_vacancy_details(vacancy_id, stop_event=None):
+    vacancy_cache = get_vacancy_cache()
+    cached = vacancy_cache.get(vacancy_id)
+    if cached and cached['fresh']:
+        vacancy_cache.count('hits')
+        return cached['data']
+    return fetch_vacancy_details(vacancy_id, cached, stop_event)
+
+# Время замеряется только для обращений к hh.ru: попадания в кэш учитывает сам кэш (VacancyCache.pop_stats)
+@metrics.instrumented("vacancy_details")
+def fetch_vacancy_details(vacancy_id, cached=None, stop_event=None):
+    """Загружает детали вакансии с hh.ru, по устаревшей записи кэша - условным запросом."""
+    vacancy_cache = get_vacancy_cache()
+    headers = {}
+    if cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+    try:
+        response = hh_client.get(f'/vacancies/{vacancy_id}', endpoint='details', stop_event=stop_event, headers=headers)
+        if response.status_code == 304 and cached:
+            vacancy_cache.touch(vacancy_id)
+            vacancy_cache.count('revalidated')
+            return cached['data']
+        response.raise_for_status()
+        details = response.json()
+        vacancy_cache.put(vacancy_id, details, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        vacancy_cache.count('misses')
+        return details
+    except RequestCancelled:
+        return None
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Не удалось получить детали вакансии {vacancy_id}: {e}")
+        return None
+
+@metrics.instrumented("apply", success=lambda result: bool(result and result[0]))
+def apply_to_vacancy(vacancy_id, resume_id, message, stop_event=None):
+    params = {'resume_id': resume_id, 'vacancy_id': vacancy_id, 'message': message}
+    try:
+        response = hh_client.post('/negotiations', endpoint='negotiations', stop_event=stop_event, params=params)
+        if response.status_code == 201:
+            logging.info(f"Успешный отклик на вакансию {vacancy_id}")
+            return True, APPLY_SUCCESS_REASON
+        response.raise_for_status()
+        return False, f"Неожиданный статус-код: {response.status_code}"
+    except RequestCancelled:
+        # Отклик не отправлен: причины нет, вызывающий не считает это попыткой
+        return False, None
+    except requests.exceptions.RequestException as e:
+        error_description = str(e)
+        if e.response is not None:
+            try:
+                error_info = e.response.json()
+                error_description = error_info.get('description', str(e))
+                if e.response.status_code == 400:
+                    for error in error_info.get('errors', []):
+                        if error.get('type') == 'bad_argument' and 'negotiation_exists' in str(error.get('value')):
+                            logging.info(f"Пропускаем вакансию {vacancy_id}: отклик уже существует.")
+                            return False, "уже откликались"
+            except ValueError:
+                error_description = e.response.text
+        logging.error(f"Не удалось откликнуться на вакансию {vacancy_id}: {error_description}")
+        return False, error_description
+
@@ -0,0 +1,133 @@
+import time
+import argparse
+import logging
+import signal
+
+from . import config
+
+# Флаги командной строки -> ключи settings.txt
+SETTINGS_FLAGS = {
+    "keyword": "keyword",
+    "exclude": "exclude_keyword",
+    "area": "area",
+    "resume": "resume",
+    "salary_from": "salary_from",
+    "salary_to": "salary_to",
+    "min_keywords": "min_keywords",
+    "search_depth": "search_depth",
+    "employer_blacklist": "employer_blacklist",
+    "match_mode": "match_mode",
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HHSearch - автоматический отклик на вакансии hh.ru")
+    parser.add_argument("--headless", action="store_true", help="запустить движок без графического интерфейса")
+    parser.add_argument("--once", action="store_true", help="выполнить один цикл поиска и завершиться (только с --headless)")
+    parser.add_argument("--settings", default=config.SETTINGS_FILE, help="файл настроек (по умолчанию settings.txt)")
+    parser.add_argument("--profiles", action="store_true",
+                        help="запустить все профили из profiles.json вместо одного набора настроек")
+    parser.add_argument("--access-token",
+                        help="токен доступа hh.ru (по умолчанию HH_ACCESS_TOKEN из .env или токен, сохраненный при авторизации в GUI)")
+    parser.add_argument("--search-letters", metavar="TEXT", default=None,
+                        help="найти отправленные письма по словам в тексте или названии вакансии и выйти")
+    parser.add_argument("--letters-employer", metavar="NAME", default="",
+                        help="вместе с --search-letters: только письма этому работодателю")
+    parser.add_argument("--export-letters", metavar="DIR",
+                        help="выгрузить архив писем в папку, по файлу на вакансию (как раньше cover_letters/), и выйти")
+    parser.add_argument("--keyword", help="ключевые слова через запятую")
+    parser.add_argument("--exclude", help="стоп-слова через запятую")
+    parser.add_argument("--area", help="ID региона")
+    parser.add_argument("--resume", help="ID резюме или значение вида 'Название (id)'")
+    parser.add_argument("--salary-from", help="зарплата от")
+    parser.add_argument("--salary-to", help="зарплата до")
+    parser.add_argument("--only-with-salary", action=argparse.BooleanOptionalAction, default=None,
+                        help="искать только с зарплатой (--no-only-with-salary отключает настройку из файла)")
+    parser.add_argument("--min-keywords", help="минимум совпавших ключевых слов")
+    parser.add_argument("--search-depth", help="глубина поиска в страницах")
+    parser.add_argument("--employer-blacklist", help="работодатели (ID или названия) через запятую")
+    parser.add_argument("--match-mode", choices=["substring", "word", "prefix", "stem"], help="режим совпадений")
+    return parser.parse_args(argv)
+
+def load_headless_settings(args):
+    """Берет настройки из файла и переопределяет их флагами командной строки."""
+    try:
+        settings = config.load_settings_file(args.settings)
+    except FileNotFoundError:
+        logging.info(f"Файл настроек {args.settings} не найден, используются значения по умолчанию и флаги.")
+        settings = dict(config.DEFAULT_SETTINGS)
+    for flag, key in SETTINGS_FLAGS.items():
+        value = getattr(args, flag)
+        if value is not None:
+            settings[key] = value
+    if args.only_with_salary is not None:
+        settings["only_with_salary"] = str(args.only_with_salary)
+    return settings
+
+def run_headless(args):
+    # Движок и клиент hh.ru импортируются только здесь, чтобы разбор аргументов оставался быстрым
+    from . import api
+    from . import engine
+
+    # Явно заданный токен не обновляется; сохраненный после авторизации в GUI обновляется автоматически
+    access_token = args.access_token or config.HH_ACCESS_TOKEN
+    if not access_token and not api.restore_access_token():
+        logging.error("Токен доступа hh.ru не задан: авторизуйтесь один раз в GUI, укажите --access-token "
+                      "или HH_ACCESS_TOKEN в .env.")
+        return 1
+    if not config.GOOGLE_API_KEY:
+        logging.error("GOOGLE_API_KEY не найден в .env файле.")
+        return 1
+    if args.profiles:
+        profiles = config.load_profiles_file()
+        if not profiles:
+            logging.error(f"Файл профилей {config.PROFILES_FILE} не найден или пуст.")
+            return 1
+    else:
+        settings = load_headless_settings(args)
+        if not engine.resolve_resume_id(settings["resume"]):
+            logging.error("Не указано резюме: задайте resume в settings.txt или флаг --resume.")
+            return 1
+        profiles = [settings]
+    if access_token:
+        api.set_access_token(access_token)
+
+    def handle_signal(signum, frame):
+        logging.info("Получен сигнал завершения, останавливаю движок.")
+        engine.stop_event.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    logging.info("Запуск автоматической отправки откликов без GUI.")
+    engine.run_engine(profiles, once=args.once)
+    return 0
+
+def run_letters(args):
+    """Поиск по архиву отправленных писем и выгрузка его в файлы."""
+    from .storage import get_letter_archive
+
+    archive = get_letter_archive()
+    if args.export_letters:
+        count = archive.export(args.export_letters)
+        print(f"Выгружено писем: {count} (папка {args.export_letters})")
+    if args.search_letters is not None:
+        letters = archive.search(args.search_letters, args.letters_employer)
+        for entry in letters:
+            created = time.strftime("%d.%m.%Y %H:%M", time.localtime(entry['created_at']))
+            print(f"=== {created} | {entry['employer']} | {entry['vacancy_name']} ({entry['vacancy_id']})")
+            print(entry['letter'])
+            print()
+        print(f"Найдено писем: {len(letters)}")
+    return 0
+
+def main(argv=None):
+    args = parse_args(argv)
+    config.setup_logging()
+    if args.export_letters or args.search_letters is not None:
+        return run_letters(args)
+    if args.headless:
+        return run_headless(args)
+
+    from . import gui
+    gui.run()
+    return 0
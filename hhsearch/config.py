@@ -0,0 +1,234 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from dotenv import load_dotenv
+
+# --- Глобальные переменные и константы ---
+# Загружаем переменные из .env, если он существует
+load_dotenv()
+
+HH_CLIENT_ID = os.getenv("HH_CLIENT_ID")
+HH_CLIENT_SECRET = os.getenv("HH_CLIENT_SECRET")
+HH_REDIRECT_URI = os.getenv("HH_REDIRECT_URI", "http://localhost:8080/") # Значение по умолчанию
+HH_ACCESS_TOKEN = os.getenv("HH_ACCESS_TOKEN")
+HH_OAUTH_TOKEN_URL = os.getenv("HH_OAUTH_TOKEN_URL", "https://hh.ru/oauth/token")
+# Токены OAuth (доступ, обновление, срок действия) хранятся в файле с правами только владельца.
+# Обновлять токен начинаем за столько секунд до истечения срока.
+TOKEN_FILE = "token.json"
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+USER_GENDER = os.getenv("USER_GENDER")
+MODEL_NAME = os.getenv("MODEL_NAME", "gemma-3-27b-it")
+# Кэширование префикса промпта (системный промпт + резюме) на стороне Gemini
+LLM_CONTEXT_CACHE = os.getenv("LLM_CONTEXT_CACHE", "False").lower() == "true"
+LLM_CONTEXT_CACHE_TTL_MINUTES = int(os.getenv("LLM_CONTEXT_CACHE_TTL_MINUTES", "60"))
+# Квоты LLM: запросов и токенов в минуту, число повторов после ошибки квоты
+LLM_RPM = int(os.getenv("LLM_RPM", "30"))
+LLM_TPM = int(os.getenv("LLM_TPM", "15000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# Таймаут одного запроса к LLM (в секундах): зависший вызов не держит поток конвейера бесконечно
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+# Грубая оценка токенов: символов на токен для русского текста и запас на ответ модели
+LLM_CHARS_PER_TOKEN = 3
+LLM_RESPONSE_TOKENS = 500
+
+# Параметры HTTP-клиента hh.ru (таймауты в секундах)
+HH_API_URL = os.getenv("HH_API_URL", "https://api.hh.ru")
+HH_CONNECT_TIMEOUT = float(os.getenv("HH_CONNECT_TIMEOUT", "5"))
+HH_READ_TIMEOUT = float(os.getenv("HH_READ_TIMEOUT", "30"))
+HH_MAX_RETRIES = int(os.getenv("HH_MAX_RETRIES", "3"))
+HH_BACKOFF_FACTOR = float(os.getenv("HH_BACKOFF_FACTOR", "0.5"))
+HH_POOL_SIZE = int(os.getenv("HH_POOL_SIZE", "10"))
+# Ограничение частоты запросов к hh.ru и число потоков загрузки деталей вакансий
+HH_REQUESTS_PER_SECOND = float(os.getenv("HH_REQUESTS_PER_SECOND", "2"))
+DETAIL_WORKERS = int(os.getenv("DETAIL_WORKERS", "5"))
+# Сколько страниц выдачи поиска загружать одновременно
+SEARCH_PREFETCH_PAGES = int(os.getenv("SEARCH_PREFETCH_PAGES", "3"))
+# Параметры конвейера: число одновременных генераций писем, размер очередей между этапами
+# и пауза между откликами (в секундах)
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "4"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "20"))
+APPLY_DELAY = float(os.getenv("APPLY_DELAY", "5"))
+# Адаптивное ограничение частоты запросов к hh.ru по классам (поиск, детали вакансий, отклики,
+# прочее): после каждого успешного ответа скорость класса растет на долю HH_RATE_INCREASE
+# от максимальной, после 429/503 умножается на HH_RATE_DECREASE, а класс ждет столько, сколько
+# указано в Retry-After (без заголовка - HH_THROTTLE_DELAY секунд). Скорость откликов не
+# превышает одного за APPLY_DELAY секунд.
+HH_MAX_REQUESTS_PER_SECOND = max(HH_REQUESTS_PER_SECOND, float(os.getenv("HH_MAX_REQUESTS_PER_SECOND", "5")))
+HH_RATE_INCREASE = float(os.getenv("HH_RATE_INCREASE", "0.02"))
+HH_RATE_DECREASE = float(os.getenv("HH_RATE_DECREASE", "0.5"))
+HH_THROTTLE_DELAY = float(os.getenv("HH_THROTTLE_DELAY", "5"))
+_APPLY_RATE = 1 / APPLY_DELAY if APPLY_DELAY > 0 else HH_MAX_REQUESTS_PER_SECOND
+HH_RATE_LIMITS = {
+    'search': {'rate': HH_REQUESTS_PER_SECOND, 'min': 0.1, 'max': HH_MAX_REQUESTS_PER_SECOND},
+    'details': {'rate': HH_REQUESTS_PER_SECOND, 'min': 0.1, 'max': HH_MAX_REQUESTS_PER_SECOND},
+    'negotiations': {'rate': _APPLY_RATE, 'min': min(_APPLY_RATE, 0.02), 'max': _APPLY_RATE},
+    'other': {'rate': HH_REQUESTS_PER_SECOND, 'min': 0.1, 'max': HH_MAX_REQUESTS_PER_SECOND},
+}
+# Отбор кандидатов: вакансии, прошедшие фильтр, оцениваются пакетом (сходство описания с резюме,
+# доля ключевых слов, зарплата), и за цикл отправляется не больше RANKING_TOP_N лучших откликов,
+# а за сутки - не больше DAILY_APPLY_BUDGET (0 - без ограничения). Не вошедшие в отбор вакансии
+# откладываются и участвуют в следующих циклах, пока они не старше RANKING_DEFERRED_DAYS дней.
+RANKING_TOP_N = int(os.getenv("RANKING_TOP_N", "20"))
+DAILY_APPLY_BUDGET = int(os.getenv("DAILY_APPLY_BUDGET", "200"))
+RANKING_DEFERRED_DAYS = float(os.getenv("RANKING_DEFERRED_DAYS", "3"))
+RANKING_WEIGHTS = {
+    'relevance': float(os.getenv("RANKING_RELEVANCE_WEIGHT", "1.0")),
+    'keywords': float(os.getenv("RANKING_KEYWORDS_WEIGHT", "0.5")),
+    'salary': float(os.getenv("RANKING_SALARY_WEIGHT", "0.3")),
+}
+# Адаптивный интервал между циклами поиска (в минутах): сокращается, пока появляются
+# новые вакансии, и растет, когда их нет
+POLL_INTERVAL_MINUTES = float(os.getenv("POLL_INTERVAL_MINUTES", "60"))
+POLL_INTERVAL_MIN_MINUTES = float(os.getenv("POLL_INTERVAL_MIN_MINUTES", "10"))
+POLL_INTERVAL_MAX_MINUTES = float(os.getenv("POLL_INTERVAL_MAX_MINUTES", "180"))
+POLL_BACKOFF_FACTOR = float(os.getenv("POLL_BACKOFF_FACTOR", "2"))
+# Запас назад от водяного знака для date_from: вакансии иногда попадают в поиск с задержкой
+SEARCH_WATERMARK_OVERLAP_MINUTES = float(os.getenv("SEARCH_WATERMARK_OVERLAP_MINUTES", "15"))
+
+# Локальный эндпоинт метрик в формате Prometheus (0 - выключен)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+SETTINGS_FILE = "settings.txt"
+# Список профилей поиска (настройки settings.txt + имя профиля)
+PROFILES_FILE = "profiles.json"
+LOG_FILE = "app.log"
+# Логирование: общий уровень, уровни отдельных категорий ("skip=WARNING,vacancy=INFO"),
+# формат text или json (JSON Lines) и ротация app.log по размеру
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_CATEGORY_LEVELS = os.getenv("LOG_CATEGORY_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+APPLIED_VACANCIES_FILE = "applied_vacancies.txt"
+REJECTED_VACANCIES_FILE = "rejected_vacancies.txt"
+COVER_LETTERS_DIR = "cover_letters"
+# Отправленные письма хранятся в архиве в базе DATABASE_FILE (с полнотекстовым индексом);
+# тексты писем сжимаются zlib, если LETTER_ARCHIVE_COMPRESS не выключен
+LETTER_ARCHIVE_COMPRESS = os.getenv("LETTER_ARCHIVE_COMPRESS", "True").lower() == "true"
+# Максимальная длина описания вакансии в промпте (символов)
+PROMPT_DESCRIPTION_LIMIT = int(os.getenv("PROMPT_DESCRIPTION_LIMIT", "4000"))
+LETTER_CACHE_FILE = f"{COVER_LETTERS_DIR}_cache.json"
+LETTER_CACHE_SIZE = int(os.getenv("LETTER_CACHE_SIZE", "2000"))
+DATABASE_FILE = "hhsearch.db"
+# Сколько часов детали вакансии считаются свежими и не перезапрашиваются
+VACANCY_CACHE_TTL_HOURS = float(os.getenv("VACANCY_CACHE_TTL_HOURS", "24"))
+VACANCY_CACHE_MAX_AGE_DAYS = 30
+# Сколько часов данные резюме берутся из дискового кэша без обращения к hh.ru.
+# После этого резюме запрашивается снова, а текст для промпта пересобирается, только если
+# на hh.ru изменилось поле updated_at
+RESUME_CACHE_TTL_HOURS = float(os.getenv("RESUME_CACHE_TTL_HOURS", "6"))
+# Сколько отказов накапливать перед пакетной записью в базу
+STATE_BATCH_SIZE = int(os.getenv("STATE_BATCH_SIZE", "50"))
+# Список отправленных откликов в GUI: размер порции истории и период обновления (мс)
+SENT_HISTORY_PAGE_SIZE = 200
+SENT_LIST_REFRESH_MS = 500
+METRICS_PANEL_REFRESH_MS = 2000
+
+# Ключи settings.txt и значения по умолчанию
+DEFAULT_SETTINGS = {
+    "keyword": "",
+    "exclude_keyword": "",
+    "area": "",
+    "resume": "",
+    "salary_from": "",
+    "only_with_salary": "False",
+    "min_keywords": "1",
+    "search_depth": "5",
+    "employer_blacklist": "",
+    "salary_to": "",
+    "match_mode": "substring",
+}
+
+# --- Настройка логирования ---
+# Категории логов (логгеры hhsearch.<категория>) для частых сообщений по отдельным вакансиям:
+#   skip    - вакансия уже обработана ранее и пропущена
+#   vacancy - вакансия найдена, отклонена или подошла по фильтру
+#   search  - запросы страниц выдачи поиска
+#   llm     - запросы к LLM по каждой вакансии
+LOG_CATEGORIES = ("skip", "vacancy", "search", "llm")
+
+class JsonLinesFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON, чтобы лог можно было разбирать построчно."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+_log_listener = None
+
+def setup_logging():
+    """Настраивает логирование через очередь: потоки движка только кладут запись в очередь,
+    а запись в файл и консоль выполняет отдельный поток QueueListener."""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    if LOG_FORMAT == "json":
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handlers = [
+        logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'),
+        logging.StreamHandler()
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(LOG_LEVEL)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _log_listener.start()
+    # При выходе дописываем оставшиеся в очереди записи
+    atexit.register(_log_listener.stop)
+
+    for item in filter(None, (part.strip() for part in LOG_CATEGORY_LEVELS.split(","))):
+        category, _, level = item.partition("=")
+        category, level = category.strip(), level.strip().upper()
+        if category not in LOG_CATEGORIES or not isinstance(logging.getLevelName(level), int):
+            logging.warning(f"Некорректная настройка LOG_CATEGORY_LEVELS: '{item}'. Пропускаю.")
+            continue
+        logging.getLogger(f"hhsearch.{category}").setLevel(level)
+
+# --- Файл настроек ---
+def load_settings_file(path=SETTINGS_FILE):
+    """Читает settings.txt (строки key=value) и дополняет отсутствующие ключи значениями по умолчанию."""
+    settings = dict(DEFAULT_SETTINGS)
+    with open(path, "r", encoding="utf-8") as f:
+        settings.update(line.strip().split("=", 1) for line in f if "=" in line)
+    return settings
+
+def save_settings_file(settings, path=SETTINGS_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        for key in DEFAULT_SETTINGS:
+            f.write(f"{key}={settings.get(key, DEFAULT_SETTINGS[key])}\n")
+
+# --- Профили поиска ---
+def load_profiles_file(path=PROFILES_FILE):
+    """Читает список профилей; у каждого профиля дополняет отсутствующие ключи значениями по умолчанию.
+
+    Если файла нет, возвращает пустой список.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            profiles = json.load(f)
+    except FileNotFoundError:
+        return []
+    return [{"name": profile.get("name", ""), **DEFAULT_SETTINGS, **profile} for profile in profiles]
+
+def save_profiles_file(profiles, path=PROFILES_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"name": profile["name"], **{key: profile.get(key, DEFAULT_SETTINGS[key]) for key in DEFAULT_SETTINGS}}
+                   for profile in profiles], f, ensure_ascii=False, indent=2)
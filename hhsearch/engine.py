@@ -0,0 +1,761 @@
+import re
+import json
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from . import api
+from . import config
+from . import metrics
+from . import ranking
+from .llm import CoverLetterGenerator
+from .matching import MATCH_MODES, KeywordMatcher, html_to_text, normalize_vacancy
+from .storage import (LetterCache, get_letter_cache, get_state_store, get_vacancy_cache, get_watermark_store,
+                      save_cover_letter)
+
+stop_event = threading.Event()
+# Как часто ожидания конвейера проверяют stop_event (в секундах)
+STOP_CHECK_INTERVAL = 0.1
+
+class PipelineStopped(Exception):
+    """Блокирующий вызов брошен по сигналу остановки, его результат не нужен."""
+
+# Логгеры категорий для частых сообщений по отдельным вакансиям (см. config.LOG_CATEGORIES).
+# Аргументы передаются через %s: если категория отключена, строка сообщения не собирается.
+skip_log = logging.getLogger("hhsearch.skip")
+vacancy_log = logging.getLogger("hhsearch.vacancy")
+search_log = logging.getLogger("hhsearch.search")
+
+# --- Асинхронный конвейер обработки вакансий ---
+class VacancyPipeline:
+    """Конвейер поиск -> детали -> фильтр -> отбор -> письмо -> отклик.
+
+    Этапы связаны ограниченными очередями asyncio, у каждого этапа свой предел
+    параллелизма, поэтому ожидание сети или LLM на одном этапе не останавливает
+    остальные. Блокирующие функции выполняются в собственном пуле потоков.
+    Отбор - точка сбора: прошедшие фильтр вакансии цикла оцениваются вместе,
+    и письма генерируются только для лучших из них (см. ranking).
+
+    Конвейер обслуживает сразу несколько профилей поиска (ключевые слова, регион,
+    резюме): одинаковые запросы поиска объединяются, детали каждой вакансии
+    загружаются один раз, а фильтр и резюме применяются отдельно для каждого
+    профиля, в выдаче которого она найдена.
+    """
+
+    def __init__(self, profiles, generator, on_applied=None, on_error=None):
+        self.profiles = profiles
+        self.generator = generator
+        self.on_applied = on_applied
+        self.on_error = on_error
+        self.state_store = get_state_store()
+        self.vacancy_cache = get_vacancy_cache()
+        self.letter_cache = get_letter_cache()
+        self.watermark_store = get_watermark_store()
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.DETAIL_WORKERS + config.LLM_WORKERS + 2, thread_name_prefix="pipeline")
+        # Пары (вакансия, профиль), уже рассмотренные в этом цикле, и вакансии, ожидающие фильтра
+        self.in_flight = set()
+        self.pending_items = {}
+        # Прошедшие фильтр вакансии цикла, ожидающие отбора
+        self.candidates = []
+        # Пары (вакансия, резюме), отложенные в прошлых циклах и возвращенные в этот отбор
+        self.deferred_keys = set()
+        # Вакансии цикла, получившие итоговый статус (отказ, отложена, отклик)
+        self.resolved = set()
+        # Итоги запросов поиска для новых водяных знаков, записываются только после полностью завершенного цикла
+        self.pending_watermarks = {}
+        self.poll_interval = min(max(config.POLL_INTERVAL_MINUTES, config.POLL_INTERVAL_MIN_MINUTES),
+                                 config.POLL_INTERVAL_MAX_MINUTES)
+
+    async def run(self, once=False):
+        """Повторяет циклы поиска, пока не установлен stop_event (или один цикл при once=True).
+
+        Пауза между циклами адаптивная: при появлении новых вакансий она делится
+        на POLL_BACKOFF_FACTOR, в тихие циклы умножается на него, оставаясь
+        в пределах POLL_INTERVAL_MIN_MINUTES..POLL_INTERVAL_MAX_MINUTES.
+        """
+        try:
+            while not stop_event.is_set():
+                new_vacancies = await self.run_cycle()
+                if once or stop_event.is_set():
+                    break
+                self._adjust_poll_interval(new_vacancies)
+                logging.info(f"Цикл поиска завершен, новых вакансий: {new_vacancies}. "
+                             f"Следующая проверка через {self.poll_interval:.0f} мин.")
+                await self._sleep(self.poll_interval * 60)
+        finally:
+            self.state_store.flush()
+            self.letter_cache.save()
+            self.generator.close()
+            # Брошенные по остановке вызовы дорабатывают в фоне (сеть и LLM ограничены таймаутами),
+            # еще не начатые отменяются
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run_cycle(self):
+        try:
+            await self._refresh_resumes()
+        except PipelineStopped:
+            return 0
+        searches = group_searches(self.profiles)
+        logging.info(f"=== Начинаю новый цикл поиска вакансий. Профилей: {len(self.profiles)}, "
+                     f"уникальных запросов поиска: {len(searches)}. ===")
+        self.in_flight.clear()
+        self.pending_items.clear()
+        self.candidates.clear()
+        self.deferred_keys.clear()
+        self.resolved.clear()
+        self.pending_watermarks.clear()
+        metrics.registry.start_cycle()
+        # Автоматы совпадений строятся один раз на цикл и используются для всех вакансий
+        for profile in self.profiles:
+            profile['matcher'] = KeywordMatcher(profile['settings']['exclude_words'], profile['settings']['keywords'],
+                                                profile['settings']['match_mode'])
+
+        details_queue = asyncio.Queue(config.PIPELINE_QUEUE_SIZE)
+        filter_queue = asyncio.Queue(config.PIPELINE_QUEUE_SIZE)
+        letter_queue = asyncio.Queue(config.PIPELINE_QUEUE_SIZE)
+        apply_queue = asyncio.Queue(config.PIPELINE_QUEUE_SIZE)
+
+        stages = [
+            (details_queue, self._start_workers(self._details_stage, details_queue, filter_queue, config.DETAIL_WORKERS)),
+            (filter_queue, self._start_workers(self._filter_stage, filter_queue, None, 1)),
+            (letter_queue, self._start_workers(self._letter_stage, letter_queue, apply_queue, config.LLM_WORKERS)),
+            (apply_queue, self._start_workers(self._apply_stage, apply_queue, None, 1)),
+        ]
+
+        try:
+            await self._enqueue_deferred(details_queue)
+            for params, profiles in searches:
+                if stop_event.is_set():
+                    break
+                await self._search_stage(params, profiles, details_queue)
+        except PipelineStopped:
+            logging.info("Получен сигнал остановки, прекращаю цикл.")
+
+        # Этапы завершаются по очереди: сначала дожидаемся опустошения входной очереди,
+        # затем останавливаем обработчики, чтобы все результаты дошли до следующего этапа.
+        # После фильтра собранные кандидаты проходят отбор и попадают в очередь писем.
+        await self._finish_stages(stages[:2])
+        try:
+            await self._select_candidates(letter_queue)
+        except PipelineStopped:
+            pass
+        await self._finish_stages(stages[2:])
+
+        self.state_store.flush()
+        cache_stats = self.vacancy_cache.pop_stats()
+        logging.info(f"Кэш деталей вакансий за цикл: попаданий {cache_stats['hits']}, "
+                     f"подтверждено сервером (304) {cache_stats['revalidated']}, загружено {cache_stats['misses']}.")
+        self.letter_cache.save()
+        letter_stats = self.letter_cache.pop_stats()
+        letter_lookups = letter_stats['hits'] + letter_stats['misses']
+        if letter_lookups:
+            logging.info(f"Кэш писем за цикл: попаданий {letter_stats['hits']} из {letter_lookups} "
+                         f"({letter_stats['hits'] / letter_lookups:.0%}).")
+
+        # Прерванный цикл мог не обработать часть найденных вакансий, поэтому знаки не сдвигаются
+        if not stop_event.is_set():
+            self._commit_watermarks()
+
+        totals = metrics.registry.finish_cycle()
+        logging.info(f"Итоги цикла за {totals['duration']:.0f} с: просмотрено {totals['seen']}, уже известно {totals['known']}, "
+                     f"отклонено {totals['rejected']}, отложено {totals['deferred']}, откликов {totals['applied']} (ошибок {totals['apply_failed']}), "
+                     f"токенов LLM {totals['llm_tokens']}.")
+        logging.info(f"Скорость запросов к hh.ru: {api.hh_client.scheduler.describe()}.")
+        return len({vacancy_id for vacancy_id, _ in self.in_flight})
+
+    async def _refresh_resumes(self):
+        """Перечитывает резюме профилей перед циклом: в пределах TTL из кэша, затем с hh.ru,
+        чтобы правки резюме попадали в письма без перезапуска. Первый цикл загружает их
+        впервые, поэтому остановка во время запуска тоже не ждет ответа hh.ru."""
+        loaded = {}
+        for profile in self.profiles:
+            resume_id = profile['resume_id']
+            if resume_id not in loaded:
+                loaded[resume_id] = await self._run_blocking(api.get_resume_details, resume_id, stop_event)
+                if not loaded[resume_id] and not profile['resume_data']:
+                    logging.warning(f"Не удалось загрузить данные резюме {resume_id}. Письма будут генерироваться без них.")
+            if loaded[resume_id]:
+                profile['resume_data'] = loaded[resume_id]
+
+    def _adjust_poll_interval(self, new_vacancies):
+        if new_vacancies:
+            interval = self.poll_interval / config.POLL_BACKOFF_FACTOR
+        else:
+            interval = self.poll_interval * config.POLL_BACKOFF_FACTOR
+        self.poll_interval = min(max(interval, config.POLL_INTERVAL_MIN_MINUTES), config.POLL_INTERVAL_MAX_MINUTES)
+
+    def _commit_watermarks(self):
+        """Сдвигает водяные знаки профилей по итогам завершенного цикла.
+
+        Знак не уходит дальше самой старой найденной вакансии, которая так и не получила
+        статус (не загрузились детали, не сгенерировалось письмо): следующий поиск
+        с учетом перекрытия снова ее найдет, и она будет обработана повторно.
+        """
+        for query, (profiles, watermarks, newest_published, found) in self.pending_watermarks.items():
+            unresolved = [published for vacancy_id, published in found.items()
+                          if vacancy_id in self.pending_items and vacancy_id not in self.resolved]
+            if None in unresolved:
+                continue
+            if unresolved:
+                names = ', '.join(profile['name'] for profile in profiles)
+                logging.info(f"Вакансий без итогового статуса для профилей {names}: {len(unresolved)}, "
+                             f"они будут найдены повторно в следующем цикле.")
+                newest_published = min(newest_published, *unresolved)
+            for profile, watermark in zip(profiles, watermarks):
+                if watermark is None or newest_published > watermark:
+                    self.watermark_store.set(profile['name'], query, format_published_at(newest_published))
+
+    async def _finish_stages(self, stages):
+        for queue, workers in stages:
+            await queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def _start_workers(self, body, in_queue, out_queue, concurrency):
+        return [asyncio.create_task(self._worker(body, in_queue, out_queue)) for _ in range(concurrency)]
+
+    async def _worker(self, body, in_queue, out_queue):
+        while True:
+            item = await in_queue.get()
+            try:
+                if stop_event.is_set():
+                    continue
+                result = await body(item)
+                if result is not None and out_queue is not None:
+                    await out_queue.put(result)
+            except PipelineStopped:
+                pass
+            except Exception:
+                logging.exception(f"Ошибка при обработке вакансии {item['vacancy'].get('id')} на этапе {body.__name__}.")
+            finally:
+                in_queue.task_done()
+
+    async def _run_blocking(self, func, *args):
+        """Выполняет func в пуле потоков. По сигналу остановки вызов бросается (PipelineStopped),
+        не дожидаясь ответа сети или LLM: этап освобождается за STOP_CHECK_INTERVAL."""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, func, *args)
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=STOP_CHECK_INTERVAL)
+            if done:
+                return future.result()
+            if stop_event.is_set():
+                future.cancel()
+                raise PipelineStopped()
+
+    async def _sleep(self, seconds):
+        """Пауза, прерываемая stop_event. Возвращает True, если получен сигнал остановки."""
+        deadline = time.monotonic() + seconds
+        while not stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(remaining, STOP_CHECK_INTERVAL))
+        return True
+
+    def _label(self, profile):
+        """Префикс сообщений лога с именем профиля (только если профилей несколько)."""
+        return f"[{profile['name']}] " if len(self.profiles) > 1 else ""
+
+    # Этап 1: постраничный поиск по одному запросу и отбрасывание уже обработанных вакансий
+    async def _search_stage(self, params, profiles, out_queue):
+        params = dict(params)
+        search_depth = max(profile['settings']['search_depth'] for profile in profiles)
+        names = ', '.join(profile['name'] for profile in profiles)
+        query = search_signature(params)
+        newest_published = None
+        # Все вакансии выдачи с датой публикации и признак того, что все нужные страницы загружены
+        found = {}
+        complete = True
+
+        # Запрашиваем только вакансии новее водяного знака; если хотя бы у одного профиля
+        # знака еще нет, выдача просматривается целиком
+        watermarks = [parse_published_at(self.watermark_store.get(profile['name'], query)) for profile in profiles]
+        if all(watermarks):
+            date_from = min(watermarks) - timedelta(minutes=config.SEARCH_WATERMARK_OVERLAP_MINUTES)
+            params['date_from'] = format_published_at(date_from)
+            logging.info(f"Поиск по запросу '{params.get('text', '')}' для профилей: {names}. "
+                         f"Только вакансии с {params['date_from']}, глубина поиска: {search_depth} страниц.")
+        else:
+            logging.info(f"Поиск по запросу '{params.get('text', '')}' для профилей: {names}. Глубина поиска: {search_depth} страниц.")
+
+        # Первая страница сообщает, сколько страниц есть в выдаче (pages). Остальные
+        # загружаются параллельно (не больше SEARCH_PREFETCH_PAGES одновременно, под общим
+        # ограничением частоты) и разбираются по мере поступления.
+        last_page = search_depth - 1
+        semaphore = asyncio.Semaphore(config.SEARCH_PREFETCH_PAGES)
+
+        async def fetch_page(page):
+            async with semaphore:
+                # Страницы за точкой досрочной остановки уже не запрашиваются
+                if stop_event.is_set() or page > last_page:
+                    return page, None
+                search_log.info("Запрашиваю страницу %s...", page)
+                return page, await self._run_blocking(api.search_vacancies, dict(params, page=page), self.on_error, stop_event)
+
+        async def handle_page(page, response_data):
+            nonlocal last_page, newest_published, complete
+            if not response_data:
+                logging.warning(f"Не удалось получить данные для страницы {page}. Пропускаю.")
+                complete = False
+                return
+            if page == 0:
+                total_pages = response_data.get('pages', search_depth)
+                last_page = min(last_page, total_pages - 1)
+                logging.info(f"Найдено вакансий: {response_data.get('found', 0)}, страниц в выдаче: {total_pages}, "
+                             f"будет просмотрено: {last_page + 1}.")
+
+            vacancies = response_data.get('items', [])
+            if not vacancies:
+                logging.info(f"На странице {page} не найдено вакансий. Дальние страницы не запрашиваются.")
+                last_page = min(last_page, page - 1)
+                return
+
+            search_log.info("Страница %s: получено %s вакансий.", page, len(vacancies))
+            for vacancy in vacancies:
+                published = parse_published_at(vacancy.get('published_at'))
+                found[vacancy['id']] = published
+                if published and (newest_published is None or published > newest_published):
+                    newest_published = published
+            # Выдача отсортирована по времени публикации: если вся страница уже известна,
+            # более дальние страницы тоже были обработаны ранее
+            if await self._process_page(page, vacancies, profiles, out_queue):
+                logging.info(f"Все {len(vacancies)} вакансий на странице {page} уже были обработаны ранее. Досрочно завершаю поиск.")
+                last_page = min(last_page, page)
+
+        page, response_data = await fetch_page(0)
+        if stop_event.is_set():
+            logging.info("Получен сигнал остановки, прекращаю цикл.")
+            return
+        await handle_page(page, response_data)
+        prefetch = [asyncio.ensure_future(fetch_page(page)) for page in range(1, last_page + 1)]
+        try:
+            for future in asyncio.as_completed(prefetch):
+                page, response_data = await future
+                if stop_event.is_set():
+                    logging.info("Получен сигнал остановки, прекращаю цикл.")
+                    break
+                if page <= last_page:
+                    await handle_page(page, response_data)
+        finally:
+            # При остановке оставшиеся загрузки не ждем, их результат не нужен
+            for task in prefetch:
+                task.cancel()
+            await asyncio.gather(*prefetch, return_exceptions=True)
+
+        # Пропущенная страница могла содержать новые вакансии: знак остается прежним
+        if newest_published is not None and complete:
+            self.pending_watermarks[query] = (profiles, watermarks, newest_published, found)
+
+    async def _process_page(self, page, vacancies, profiles, out_queue):
+        """Отбрасывает уже обработанные вакансии страницы и передает остальные дальше.
+
+        Возвращает True, если вся страница уже была обработана ранее.
+        """
+        # Профили с меньшей глубиной поиска не участвуют в разборе дальних страниц
+        active_profiles = [profile for profile in profiles if page < profile['settings']['search_depth']]
+        vacancy_ids = [v['id'] for v in vacancies]
+        known_by_resume = {}
+        for resume_id in {profile['resume_id'] for profile in active_profiles}:
+            known_by_resume[resume_id] = await self._run_blocking(
+                self.state_store.known_statuses, vacancy_ids, resume_id)
+        known_vacancies_on_page = 0
+        metrics.registry.add('seen', len(vacancies))
+
+        for vacancy in vacancies:
+            vacancy_id = vacancy['id']
+            vacancy_name = vacancy['name']
+
+            candidates = [profile for profile in active_profiles
+                          if vacancy_id not in known_by_resume[profile['resume_id']]]
+            if not candidates:
+                status = known_by_resume[active_profiles[0]['resume_id']][vacancy_id]
+                skip_log.info("Вакансия '%s' (%s) уже в списке '%s'. Пропускаю.", vacancy_name, vacancy_id, status)
+                known_vacancies_on_page += 1
+                continue
+
+            await self._enqueue(vacancy, candidates, out_queue)
+
+        metrics.registry.add('known', known_vacancies_on_page)
+        return known_vacancies_on_page == len(vacancies)
+
+    async def _enqueue(self, vacancy, candidates, out_queue):
+        """Применяет предфильтр профилей и передает вакансию на загрузку деталей.
+
+        Если вакансия уже ждет фильтра после другого запроса поиска, новые профили
+        добавляются к ней; иначе она ставится в очередь заново, и детали берутся
+        из общего кэша без повторного запроса к hh.ru.
+        """
+        vacancy_id = vacancy['id']
+        vacancy_name = vacancy['name']
+        passed, rejections = [], []
+        for profile in candidates:
+            if (vacancy_id, profile['name']) in self.in_flight:
+                continue
+            self.in_flight.add((vacancy_id, profile['name']))
+            prefilter_reason = self._prefilter(vacancy, profile)
+            if prefilter_reason:
+                vacancy_log.info("%sВакансия '%s' (%s) отклонена без загрузки деталей: %s.",
+                                 self._label(profile), vacancy_name, vacancy_id, prefilter_reason)
+                rejections.append((profile, f"предфильтр: {prefilter_reason}"))
+            else:
+                passed.append(profile)
+        self._reject(vacancy, rejections, passed)
+        if not passed:
+            return
+
+        item = self.pending_items.get(vacancy_id)
+        if item is not None and not item['filtered']:
+            item['profiles'].extend(passed)
+            return
+        if item is not None and 'profile' in item:
+            # Вакансию уже принял другой профиль, отклик на нее будет отправлен один раз
+            return
+        vacancy_log.info("Найдена новая вакансия '%s' (%s). Загружаю детали...", vacancy_name, vacancy_id)
+        self.resolved.discard(vacancy_id)
+        item = {'vacancy': vacancy, 'profiles': passed, 'filtered': False}
+        self.pending_items[vacancy_id] = item
+        await out_queue.put(item)
+
+    def _prefilter(self, vacancy, profile):
+        """Дешевая проверка по данным из выдачи поиска. Возвращает причину отказа или None."""
+        settings = profile['settings']
+        employer = vacancy.get('employer') or {}
+        blacklist = settings['employer_blacklist']
+        if blacklist and (str(employer.get('id', '')) in blacklist or employer.get('name', '').lower() in blacklist):
+            return f"работодатель '{employer.get('name', '')}' в черном списке"
+
+        salary = vacancy.get('salary') or {}
+        if salary.get('currency') == 'RUR':
+            salary_min, salary_max = settings['salary_min'], settings['salary_max']
+            if salary_min and salary.get('to') and salary['to'] < salary_min:
+                return f"зарплата до {salary['to']} ниже {salary_min}"
+            if salary_max and salary.get('from') and salary['from'] > salary_max:
+                return f"зарплата от {salary['from']} выше {salary_max}"
+
+        snippet = vacancy.get('snippet') or {}
+        short_text = ' '.join(filter(None, (vacancy.get('name'), snippet.get('requirement'), snippet.get('responsibility'))))
+        matched_stop_words, _ = profile['matcher'].match(html_to_text(short_text).lower())
+        if matched_stop_words:
+            return "стоп-слова " + ', '.join(f"'{word}'" for word in matched_stop_words)
+        return None
+
+    # Этап 2: загрузка деталей вакансии
+    async def _details_stage(self, item):
+        vacancy_id = item['vacancy']['id']
+        details = await self._run_blocking(api.get_vacancy_details, vacancy_id, stop_event)
+        if not details:
+            if stop_event.is_set():
+                return None
+            logging.warning(f"Не удалось получить детали для вакансии {vacancy_id}, пропускаю.")
+            return None
+        if item.get('deferred'):
+            # Отложенная вакансия восстановлена из базы без данных выдачи поиска
+            item['vacancy'] = details
+            published = parse_published_at(details.get('published_at'))
+            if published and published < datetime.now(timezone.utc) - timedelta(days=config.RANKING_DEFERRED_DAYS):
+                vacancy_log.info("Отложенная вакансия '%s' (%s) опубликована более %s дн. назад, снимаю с отбора.",
+                                 details.get('name'), vacancy_id, config.RANKING_DEFERRED_DAYS)
+                self._reject(details, [(profile, f"не вошла в отбор за {config.RANKING_DEFERRED_DAYS:g} дн.")
+                                       for profile in item['profiles']])
+                return None
+        item['record'] = normalize_vacancy(details)
+        return item
+
+    # Этап 3: фильтрация по стоп-словам и ключевым словам
+    async def _filter_stage(self, item):
+        vacancy_id = item['vacancy']['id']
+        vacancy_name = item['vacancy']['name']
+        # После этого момента новые профили к вакансии не добавляются
+        item['filtered'] = True
+        rejections = []
+        # Профили проверяются в порядке списка: откликаемся резюме первого подходящего
+        for profile in sorted(item['profiles'], key=self.profiles.index):
+            with metrics.timer("filter"):
+                reason = self._match_profile(item, profile)
+            if reason is None:
+                vacancy_log.info("%sВакансия '%s' (%s) подходит по критериям.",
+                                 self._label(profile), vacancy_name, vacancy_id)
+                item['profile'] = profile
+                self.candidates.append(item)
+                return None
+            rejections.append((profile, reason))
+        self._reject(item['vacancy'], rejections)
+        self.resolved.add(vacancy_id)
+        return None
+
+    def _match_profile(self, item, profile):
+        """Проверяет полное описание вакансии фильтром профиля. Возвращает причину отказа или None."""
+        vacancy_id = item['vacancy']['id']
+        vacancy_name = item['vacancy']['name']
+        matched_stop_words, matched_keywords = profile['matcher'].match(item['record']['match_text'])
+
+        if matched_stop_words:
+            stop_words = ', '.join(f"'{word}'" for word in matched_stop_words)
+            vacancy_log.info("%sВакансия '%s' (%s) отклонена: найдены стоп-слова %s.",
+                             self._label(profile), vacancy_name, vacancy_id, stop_words)
+            return f"стоп-слова {stop_words}"
+
+        min_keywords_required = profile['settings']['min_keywords_required']
+        matched_keywords_count = len(matched_keywords)
+        if matched_keywords_count < min_keywords_required:
+            vacancy_log.info("%sВакансия '%s' (%s) отклонена: найдено %s из %s ключевых слов.",
+                             self._label(profile), vacancy_name, vacancy_id, matched_keywords_count, min_keywords_required)
+            return f"ключевых слов {matched_keywords_count} из {min_keywords_required}"
+        item['matched_keywords'] = matched_keywords
+        return None
+
+    def _reject(self, vacancy, rejections, passed=()):
+        """Записывает отказ для каждого резюме, если ни один профиль с этим резюме вакансию не пропустил."""
+        if rejections and not passed:
+            metrics.registry.add('rejected')
+        accepted_resumes = {profile['resume_id'] for profile in passed}
+        for profile, reason in rejections:
+            resume_id = profile['resume_id']
+            if resume_id in accepted_resumes:
+                continue
+            accepted_resumes.add(resume_id)
+            self.state_store.record(vacancy['id'], 'rejected', resume_id, reason,
+                                    vacancy['name'], vacancy.get('employer', {}).get('name', ''))
+
+    async def _enqueue_deferred(self, out_queue):
+        """Возвращает в конвейер вакансии, отложенные при отборе в прошлых циклах.
+
+        Поиск считает их уже известными, поэтому они ставятся на загрузку деталей
+        напрямую (детали обычно берутся из кэша) и снова проходят фильтр и отбор.
+        """
+        since = time.time() - config.RANKING_DEFERRED_DAYS * 86400
+        rows = await self._run_blocking(self.state_store.deferred, since)
+        count = 0
+        # В in_flight они не попадают: по нему run_cycle считает новые вакансии для адаптивной паузы
+        for vacancy_id, resume_id, vacancy_name in rows:
+            profiles = [profile for profile in self.profiles if profile['resume_id'] == resume_id]
+            if not profiles:
+                continue
+            self.deferred_keys.add((vacancy_id, resume_id))
+            item = self.pending_items.get(vacancy_id)
+            if item is not None:
+                item['profiles'].extend(profiles)
+                continue
+            item = {'vacancy': {'id': vacancy_id, 'name': vacancy_name}, 'profiles': profiles,
+                    'filtered': False, 'deferred': True}
+            self.pending_items[vacancy_id] = item
+            await out_queue.put(item)
+            count += 1
+        if count:
+            logging.info(f"Отложенных в прошлых циклах вакансий возвращено в отбор: {count}.")
+
+    def _apply_limit(self):
+        """Сколько откликов можно отправить в этом цикле: RANKING_TOP_N и остаток суточного
+        бюджета DAILY_APPLY_BUDGET. None - без ограничения."""
+        limits = []
+        if config.RANKING_TOP_N > 0:
+            limits.append(config.RANKING_TOP_N)
+        if config.DAILY_APPLY_BUDGET > 0:
+            midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+            limits.append(max(config.DAILY_APPLY_BUDGET - self.state_store.count_applied_since(midnight), 0))
+        return min(limits) if limits else None
+
+    # Этап 4: отбор лучших кандидатов цикла
+    async def _select_candidates(self, out_queue):
+        """Оценивает всех прошедших фильтр кандидатов цикла и передает на генерацию писем
+        только лучших в пределах лимита. Остальные откладываются до следующих циклов."""
+        if not self.candidates or stop_event.is_set():
+            return
+        candidates = list(self.candidates)
+        with metrics.timer("ranking"):
+            scores = await self._run_blocking(ranking.score_candidates, candidates)
+        limit = await self._run_blocking(self._apply_limit)
+        ranked = sorted(zip(scores.tolist(), candidates), key=lambda pair: pair[0], reverse=True)
+        selected = ranked if limit is None else ranked[:limit]
+        deferred = 0
+        for score, item in ranked[len(selected):]:
+            self.resolved.add(item['vacancy']['id'])
+            # Уже отложенная вакансия сохраняет исходную запись: она не считается заново,
+            # а срок RANKING_DEFERRED_DAYS отсчитывается от первого откладывания
+            if (item['vacancy']['id'], item['profile']['resume_id']) in self.deferred_keys:
+                continue
+            deferred += 1
+            self.state_store.record(item['vacancy']['id'], 'deferred', item['profile']['resume_id'],
+                                    f"рейтинг {score:.2f}: не вошла в отбор цикла",
+                                    item['vacancy']['name'], item['vacancy'].get('employer', {}).get('name', ''))
+        metrics.registry.add('deferred', deferred)
+        still_deferred = len(ranked) - len(selected) - deferred
+        limit_text = "без ограничения" if limit is None else f"лимит {limit}"
+        logging.info(f"Отбор кандидатов: оценено {len(ranked)}, выбрано {len(selected)}, отложено {deferred}, "
+                     f"остаются отложенными с прошлых циклов {still_deferred} ({limit_text}).")
+        for score, item in selected:
+            vacancy_log.info("%sВакансия '%s' (%s) выбрана с оценкой %.2f. Генерирую письмо...",
+                             self._label(item['profile']), item['vacancy']['name'], item['vacancy']['id'], score)
+            await out_queue.put(item)
+
+    # Этап 5: генерация сопроводительного письма
+    async def _letter_stage(self, item):
+        vacancy_id = item['vacancy']['id']
+        profile = item['profile']
+        fingerprint = LetterCache.fingerprint(resume_version(profile), item['record'])
+        generated_letter = self.letter_cache.get(fingerprint)
+        if generated_letter:
+            logging.info(f"Для вакансии {vacancy_id} найдено готовое письмо по совпадающему описанию, LLM не вызывается.")
+        else:
+            generated_letter = await self._run_blocking(self._generate_letter, fingerprint, item['record'], profile['resume_data'])
+            if not generated_letter:
+                logging.error(f"Не удалось сгенерировать письмо для вакансии {vacancy_id}, пропускаю.")
+                return None
+        item['letter'] = generated_letter
+        return item
+
+    def _generate_letter(self, fingerprint, record, resume_data):
+        """Выполняется в пуле потоков. Письмо сразу попадает в кэш: если этап брошен по остановке,
+        готовое письмо не потеряется и при следующем запуске LLM повторно не вызывается."""
+        generated_letter = self.generator.generate(record, resume_data, stop_event)
+        if generated_letter:
+            self.letter_cache.put(fingerprint, generated_letter)
+            if stop_event.is_set():
+                self.letter_cache.save()
+        return generated_letter
+
+    # Этап 6: отправка отклика
+    async def _apply_stage(self, item):
+        profile = item['profile']
+        logging.info(f"{self._label(profile)}Отправляю отклик на вакансию '{item['vacancy']['name']}' ({item['vacancy']['id']})...")
+        # Отклики идут с темпом класса negotiations планировщика запросов (начальная пауза - APPLY_DELAY),
+        # остальные этапы в это время продолжают работу
+        await self._run_blocking(self._send_application, item)
+        return None
+
+    def _send_application(self, item):
+        """Выполняется в пуле потоков целиком: отклик, ушедший на hh.ru уже после сигнала
+        остановки, все равно записывается в базу и появляется в списке отправленных."""
+        vacancy = item['vacancy']
+        vacancy_id = vacancy['id']
+        vacancy_name = vacancy['name']
+        profile = item['profile']
+
+        success, reason = api.apply_to_vacancy(vacancy_id, profile['resume_id'], item['letter'], stop_event)
+        if reason is None:
+            # Остановка до отправки: вакансия останется новой для следующего запуска
+            return
+
+        employer_name = vacancy.get('employer', {}).get('name', '')
+        self.state_store.record(vacancy_id, 'applied', profile['resume_id'], reason, vacancy_name, employer_name)
+        self.resolved.add(vacancy_id)
+
+        metrics.registry.add('applied' if success else 'apply_failed')
+        if success:
+            save_cover_letter(vacancy_id, vacancy_name, item['letter'], employer_name, profile['resume_id'],
+                              getattr(self.generator, 'model_name', None))
+        # Сообщаем о каждой попытке, в том числе неудачной: статус виден в списке откликов
+        if self.on_applied:
+            self.on_applied({
+                'vacancy_id': vacancy_id,
+                'vacancy_name': vacancy_name,
+                'employer': employer_name,
+                'url': vacancy.get('alternate_url'),
+                'status': reason,
+                'created_at': time.time(),
+            })
+
+# --- Запуск движка ---
+def build_pipeline_settings(settings):
+    """Преобразует строковые настройки (settings.txt, поля GUI или флаги CLI) в параметры конвейера."""
+    params = {
+        'text': settings['keyword'],
+        'order_by': 'publication_time',
+        'per_page': 50
+    }
+    if settings['area']:
+        params['area'] = settings['area']
+
+    params['only_with_salary'] = str(settings['only_with_salary']).lower() == "true"
+
+    if settings['salary_from'].isdigit():
+        params['salary'] = int(settings['salary_from'])
+        params['currency'] = 'RUR'
+
+    return {
+        'params': params,
+        'search_depth': int(settings['search_depth']) if settings['search_depth'].isdigit() else 5,
+        'exclude_words': [word.strip() for word in settings['exclude_keyword'].lower().split(',') if word.strip()],
+        'keywords': [word.strip() for word in settings['keyword'].lower().split(',') if word.strip()],
+        'min_keywords_required': int(settings['min_keywords']) if settings['min_keywords'].isdigit() else 1,
+        'match_mode': settings['match_mode'] if settings['match_mode'] in MATCH_MODES.values() else "substring",
+        'employer_blacklist': {word.strip() for word in settings['employer_blacklist'].lower().split(',') if word.strip()},
+        'salary_min': params.get('salary'),
+        'salary_max': int(settings['salary_to']) if settings['salary_to'].isdigit() else None,
+    }
+
+def resolve_resume_id(resume_setting):
+    """Достает ID резюме из значения вида "Название (id)" или возвращает строку как есть."""
+    match = re.search(r'\(([^()]+)\)\s*$', resume_setting or '')
+    return match.group(1) if match else (resume_setting or '').strip() or None
+
+def build_profile(settings, resume_id, resume_data, name=None):
+    """Собирает профиль конвейера: настройки фильтра, резюме и его данные для промпта."""
+    return {
+        'name': name or settings.get('name') or resume_id,
+        'settings': build_pipeline_settings(settings),
+        'resume_id': resume_id,
+        'resume_data': resume_data,
+    }
+
+def resume_version(profile):
+    """ID резюме вместе с датой его изменения: письма к прежней версии резюме не переиспользуются."""
+    updated_at = (profile['resume_data'] or {}).get('updated_at')
+    return f"{profile['resume_id']}@{updated_at}" if updated_at else profile['resume_id']
+
+def search_signature(params):
+    """Подпись запроса поиска (без номера страницы и date_from) для привязки водяного знака."""
+    return json.dumps(sorted((key, value) for key, value in params.items() if key not in ('page', 'date_from')),
+                      ensure_ascii=False)
+
+def parse_published_at(value):
+    """Разбирает дату hh.ru вида 2024-05-01T10:00:00+0300. Возвращает None для пустых и некорректных значений."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+    except ValueError:
+        return None
+
+def format_published_at(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+def group_searches(profiles):
+    """Объединяет профили с одинаковыми параметрами поиска: [(params, [профили]), ...]."""
+    searches = {}
+    for profile in profiles:
+        params = profile['settings']['params']
+        searches.setdefault(tuple(sorted(params.items())), (params, []))[1].append(profile)
+    return list(searches.values())
+
+def run_engine(profiles, on_applied=None, on_error=None, once=False, generator=None):
+    """Запускает конвейер в текущем потоке и возвращается после остановки через stop_event.
+
+    profiles - список настроек в формате settings.txt (с ключом name); резюме
+    каждого профиля берется из его поля resume. generator - генератор писем
+    (по умолчанию CoverLetterGenerator, бенчмарк передает свой).
+    """
+    pipeline_profiles = []
+    for index, settings in enumerate(profiles, 1):
+        if stop_event.is_set():
+            return
+        name = settings.get('name') or f"Профиль {index}"
+        resume_id = resolve_resume_id(settings['resume'])
+        if not resume_id:
+            logging.warning(f"В профиле '{name}' не указано резюме, профиль пропущен.")
+            continue
+        # Данные резюме загружает сам конвейер в начале каждого цикла (см. VacancyPipeline._refresh_resumes)
+        pipeline_profiles.append(build_profile(settings, resume_id, None, name))
+    if not pipeline_profiles:
+        logging.error("Нет ни одного профиля с указанным резюме, движок не запущен.")
+        return
+
+    metrics.start_metrics_server()
+    pipeline = VacancyPipeline(pipeline_profiles, generator or CoverLetterGenerator(), on_applied, on_error)
+    asyncio.run(pipeline.run(once))
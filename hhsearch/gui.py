@@ -0,0 +1,602 @@
+import os
+import webbrowser
+import requests
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext
+from dotenv import set_key
+import threading
+import logging
+import queue
+import time
+import http.server
+import socketserver
+from urllib.parse import urlparse, parse_qs
+
+from . import api
+from . import config
+from . import engine
+from . import metrics
+from .engine import stop_event
+from .matching import MATCH_MODES
+from .storage import get_state_store
+
+resumes = {}
+profiles = []
+auto_send_thread = None
+# Как часто при повторном запуске проверять, завершился ли остановленный движок (в миллисекундах)
+ENGINE_STOP_POLL_MS = 100
+httpd = None
+# Записи для списка откликов: движок и фоновая загрузка истории кладут их в очередь,
+# главный поток забирает их порциями по таймеру
+sent_queue = queue.Queue()
+sent_urls = {}
+sent_history = {'before': None, 'has_more': True, 'loading': False}
+# Подписи операций в панели метрик
+OPERATION_LABELS = {
+    "search": "Поиск",
+    "vacancy_details": "Детали",
+    "filter": "Фильтр",
+    "cover_letter": "Письмо LLM",
+    "apply": "Отклик",
+}
+
+# --- Логика автоматической отправки ---
+def auto_send_logic(profiles_to_run):
+    def on_applied(entry):
+        sent_queue.put(('new', entry))
+
+    def on_error(message):
+        root.after(0, messagebox.showerror, "Ошибка", message)
+
+    engine.run_engine(profiles_to_run, on_applied, on_error)
+    # Движок завершился сам (например, ни в одном профиле нет резюме) - возвращаем кнопку в исходное состояние
+    if not stop_event.is_set():
+        root.after(0, stop_auto_send)
+
+# --- Функции для GUI и запуска ---
+def start_server_and_authorize():
+    global httpd
+    try:
+        port = urlparse(config.HH_REDIRECT_URI).port
+        if not port:
+            raise ValueError("Порт не указан в HH_REDIRECT_URI.")
+    except Exception as e:
+        messagebox.showerror("Ошибка конфигурации", str(e))
+        return
+
+    class AuthHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            auth_code = parse_qs(urlparse(self.path).query).get('code', [None])[0]
+            self.send_response(200)
+            self.send_header('Content-type', 'text/html; charset=utf-8')
+            self.end_headers()
+            if auth_code:
+                success_message = "<html><body><h1>Успешно!</h1><p>Можно закрыть эту вкладку.</p></body></html>"
+                self.wfile.write(success_message.encode('utf-8'))
+                root.after(0, complete_authorization, auth_code)
+            else:
+                error_message = "<html><body><h1>Ошибка!</h1><p>Не удалось получить код авторизации.</p></body></html>"
+                self.wfile.write(error_message.encode('utf-8'))
+            
+            threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+        def log_message(self, format, *args):
+            return
+
+    try:
+        socketserver.TCPServer.allow_reuse_address = True
+        httpd = socketserver.TCPServer(("localhost", port), AuthHandler)
+        logging.info(f"Запуск сервера на порту {port}...")
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        webbrowser.open(f"https://hh.ru/oauth/authorize?response_type=code&client_id={config.HH_CLIENT_ID}&redirect_uri={config.HH_REDIRECT_URI}")
+    except Exception as e:
+        logging.exception(f"Не удалось запустить сервер на порту {port}.")
+        messagebox.showerror("Ошибка", f"Не удалось запустить сервер на порту {port}: {e}")
+
+def complete_authorization(auth_code):
+    try:
+        api.get_access_token(auth_code)
+    except requests.exceptions.RequestException as e:
+        logging.exception("Ошибка при получении токена доступа.")
+        messagebox.showerror("Ошибка", f"Не удалось получить токен: {e}")
+        return
+    messagebox.showinfo("Успех", "Авторизация прошла успешно!")
+    show_main_window()
+
+def load_resumes():
+    if not api.access_token: return
+    loaded_resumes = api.get_resumes()
+    if loaded_resumes is None:
+        root.after(0, messagebox.showerror, "Ошибка", "Не удалось загрузить резюме.")
+        return
+    resumes.clear()
+    resumes.update(loaded_resumes)
+    root.after(0, update_resume_combobox, list(resumes.keys()))
+
+def update_resume_combobox(resume_keys):
+    resume_combobox['values'] = resume_keys
+    if resume_keys:
+        resume_combobox.current(0)
+    load_settings()
+    load_profiles()
+
+def start_auto_send():
+    global auto_send_thread
+    if auto_send_thread and auto_send_thread.is_alive():
+        if not stop_event.is_set():
+            return
+        # Остановленный движок бросает ожидания сети и LLM и завершается за доли секунды.
+        # Окно при этом не блокируется: запуск повторяется по таймеру после его завершения
+        status_label.config(text="Статус: Дожидаюсь остановки предыдущего запуска...", style="Red.TLabel")
+        auto_send_button.config(state="disabled")
+        root.after(ENGINE_STOP_POLL_MS, start_after_previous_run)
+        return
+    if not config.GOOGLE_API_KEY:
+        messagebox.showerror("Ошибка", "Ключ GOOGLE_API_KEY не найден.")
+        return
+    if run_all_profiles_var.get() and profiles:
+        profiles_to_run = [dict(profile) for profile in profiles]
+    else:
+        settings = collect_settings()
+        if not settings['resume'] or settings['resume'] not in resumes:
+            messagebox.showwarning("Внимание", "Пожалуйста, выберите резюме.")
+            return
+        profiles_to_run = [settings]
+    save_settings()
+    stop_event.clear()
+    logging.info("Запуск автоматической отправки откликов.")
+    auto_send_button.config(text="Остановить автоотправку", command=stop_auto_send)
+    status_label.config(text="Статус: Автоотправка запущена", style="Green.TLabel")
+    auto_send_thread = threading.Thread(target=auto_send_logic, args=(profiles_to_run,), daemon=True)
+    auto_send_thread.start()
+
+def start_after_previous_run():
+    if auto_send_thread.is_alive():
+        root.after(ENGINE_STOP_POLL_MS, start_after_previous_run)
+        return
+    auto_send_button.config(state="normal")
+    start_auto_send()
+
+def stop_auto_send():
+    logging.info("Остановка автоматической отправки откликов.")
+    stop_event.set()
+    auto_send_button.config(text="Запустить автоотправку", command=start_auto_send)
+    status_label.config(text="Статус: Автоотправка остановлена", style="Red.TLabel")
+
+# --- Список отправленных откликов ---
+def load_sent_history():
+    """Читает из базы очередную порцию истории откликов (в фоновом потоке)."""
+    try:
+        rows = get_state_store().applied_history(sent_history['before'])
+    except Exception:
+        logging.exception("Не удалось загрузить историю откликов.")
+        rows = []
+    sent_queue.put(('history', rows))
+
+def request_sent_history():
+    if sent_history['loading'] or not sent_history['has_more']: return
+    sent_history['loading'] = True
+    threading.Thread(target=load_sent_history, daemon=True).start()
+
+def drain_sent_queue():
+    """Переносит накопившиеся записи из очереди в таблицу и перезапускает таймер."""
+    try:
+        while True:
+            kind, payload = sent_queue.get_nowait()
+            if kind == 'history':
+                append_sent_history(payload)
+            else:
+                add_to_sent_list(payload)
+    except queue.Empty:
+        pass
+    root.after(config.SENT_LIST_REFRESH_MS, drain_sent_queue)
+
+def sent_row_values(vacancy_name, employer, created_at, status):
+    return (employer or "", vacancy_name or "", time.strftime("%d.%m.%Y %H:%M", time.localtime(created_at)), status or "")
+
+def add_to_sent_list(entry):
+    """Добавляет новый отклик в начало списка (или обновляет уже показанный)."""
+    vacancy_id = entry['vacancy_id']
+    values = sent_row_values(entry['vacancy_name'], entry['employer'], entry['created_at'], entry['status'])
+    if entry.get('url'):
+        sent_urls[vacancy_id] = entry['url']
+    if sent_tree.exists(vacancy_id):
+        sent_tree.item(vacancy_id, values=values)
+        sent_tree.move(vacancy_id, "", 0)
+    else:
+        sent_tree.insert("", 0, iid=vacancy_id, values=values)
+
+def append_sent_history(rows):
+    """Дописывает порцию истории в конец списка; записи, уже показанные после запуска, пропускаются."""
+    for vacancy_id, vacancy_name, employer, reason, created_at in rows:
+        if not sent_tree.exists(vacancy_id):
+            sent_tree.insert("", "end", iid=vacancy_id, values=sent_row_values(vacancy_name or vacancy_id, employer, created_at, reason))
+    if rows:
+        sent_history['before'] = (rows[-1][4], rows[-1][0])
+    sent_history['has_more'] = len(rows) == config.SENT_HISTORY_PAGE_SIZE
+    sent_history['loading'] = False
+
+def on_sent_list_scroll(first, last):
+    sent_scrollbar.set(first, last)
+    # Следующая порция истории подгружается, когда список прокручен почти до конца
+    if float(last) >= 0.95:
+        request_sent_history()
+
+# --- Панель метрик ---
+def update_metrics_panel():
+    summary = metrics.registry.summary()
+    cycle = summary['last_cycle'] or summary['current_cycle']
+    title = "Последний цикл" if summary['last_cycle'] else "Текущий цикл"
+    lines = [
+        f"{title}: просмотрено {cycle['seen']}, известно {cycle['known']}, отклонено {cycle['rejected']}, "
+        f"отложено {cycle['deferred']}",
+        f"откликов {cycle['applied']} (ошибок {cycle['apply_failed']}), токенов LLM {cycle['llm_tokens']}",
+        f"Всего за запуск: циклов {summary['cycles']}, откликов {summary['totals']['applied']}, "
+        f"токенов LLM {summary['totals']['llm_tokens']}",
+    ]
+    for operation, label in OPERATION_LABELS.items():
+        stats = summary['operations'].get(operation)
+        if stats:
+            lines.append(f"{label}: {stats['count']} шт., среднее {stats['avg'] * 1000:.0f} мс, ошибок {stats['errors']}")
+    rates = []
+    for endpoint, state in summary['rate_limits'].items():
+        rate = f"{endpoint} {state['rate']:.2f}/с"
+        if state['blocked_for']:
+            rate += f" (пауза {state['blocked_for']:.0f} с)"
+        if state['throttled']:
+            rate += f", 429/503: {state['throttled']}"
+        rates.append(rate)
+    if rates:
+        lines.append("Скорость запросов к hh.ru: " + "; ".join(rates))
+    metrics_label.config(text="\n".join(lines))
+    root.after(config.METRICS_PANEL_REFRESH_MS, update_metrics_panel)
+
+def open_sent_vacancy(event):
+    vacancy_id = sent_tree.identify_row(event.y)
+    if vacancy_id:
+        webbrowser.open(sent_urls.get(vacancy_id, f"https://hh.ru/vacancy/{vacancy_id}"), new=2)
+
+def collect_settings():
+    """Собирает параметры поиска из полей ввода в формате settings.txt."""
+    return {
+        "keyword": keyword_entry.get(),
+        "exclude_keyword": exclude_keyword_entry.get(),
+        "area": area_entry.get(),
+        "resume": resume_combobox.get(),
+        "salary_from": salary_entry.get(),
+        "only_with_salary": str(salary_only_var.get()),
+        "min_keywords": min_keywords_entry.get(),
+        "search_depth": search_depth_entry.get(),
+        "employer_blacklist": employer_blacklist_entry.get(),
+        "salary_to": salary_to_entry.get(),
+        "match_mode": MATCH_MODES.get(match_mode_combobox.get(), "substring"),
+    }
+
+def save_settings():
+    try:
+        config.save_settings_file(collect_settings())
+        logging.info("Параметры поиска сохранены.")
+    except Exception as e:
+        logging.exception("Не удалось сохранить настройки.")
+        messagebox.showerror("Ошибка", f"Не удалось сохранить настройки: {e}")
+
+def apply_settings(settings):
+    """Заполняет поля ввода значениями из словаря в формате settings.txt."""
+    keyword_entry.delete(0, tk.END); keyword_entry.insert(0, settings["keyword"])
+    exclude_keyword_entry.delete(0, tk.END); exclude_keyword_entry.insert(0, settings["exclude_keyword"])
+    area_entry.delete(0, tk.END); area_entry.insert(0, settings["area"])
+    salary_entry.delete(0, tk.END); salary_entry.insert(0, settings["salary_from"])
+    min_keywords_entry.delete(0, tk.END); min_keywords_entry.insert(0, settings["min_keywords"])
+    search_depth_entry.delete(0, tk.END); search_depth_entry.insert(0, settings["search_depth"])
+    employer_blacklist_entry.delete(0, tk.END); employer_blacklist_entry.insert(0, settings["employer_blacklist"])
+    salary_to_entry.delete(0, tk.END); salary_to_entry.insert(0, settings["salary_to"])
+    salary_only_var.set(settings["only_with_salary"].lower() == "true")
+    match_mode = settings["match_mode"]
+    match_mode_combobox.set(next((label for label, mode in MATCH_MODES.items() if mode == match_mode), "Подстрока"))
+    if (resume_to_set := settings["resume"]) and resume_to_set in resume_combobox['values']:
+        resume_combobox.set(resume_to_set)
+
+def load_settings():
+    try:
+        apply_settings(config.load_settings_file())
+        logging.info("Настройки успешно загружены.")
+    except FileNotFoundError:
+        logging.info("Файл настроек не найден.")
+    except Exception as e:
+        logging.exception("Не удалось загрузить настройки.")
+        messagebox.showerror("Ошибка", f"Не удалось загрузить настройки: {e}")
+
+# --- Профили поиска ---
+def load_profiles():
+    try:
+        profiles[:] = config.load_profiles_file()
+    except Exception as e:
+        logging.exception("Не удалось загрузить профили.")
+        messagebox.showerror("Ошибка", f"Не удалось загрузить профили: {e}")
+        return
+    refresh_profiles_listbox()
+    run_all_profiles_var.set(bool(profiles))
+    logging.info(f"Загружено профилей поиска: {len(profiles)}.")
+
+def refresh_profiles_listbox():
+    profiles_listbox.delete(0, tk.END)
+    for profile in profiles:
+        profiles_listbox.insert(tk.END, f"{profile['name']} - {profile['resume'] or 'резюме не выбрано'}")
+
+def save_profile():
+    """Сохраняет текущие поля как профиль с указанным именем (существующий профиль заменяется)."""
+    name = profile_name_entry.get().strip()
+    if not name:
+        messagebox.showwarning("Внимание", "Введите имя профиля.")
+        return
+    profile = {"name": name, **collect_settings()}
+    existing = next((index for index, p in enumerate(profiles) if p['name'] == name), None)
+    if existing is None:
+        profiles.append(profile)
+    else:
+        profiles[existing] = profile
+    try:
+        config.save_profiles_file(profiles)
+        logging.info(f"Профиль '{name}' сохранен.")
+    except Exception as e:
+        logging.exception("Не удалось сохранить профили.")
+        messagebox.showerror("Ошибка", f"Не удалось сохранить профили: {e}")
+    refresh_profiles_listbox()
+
+def selected_profile_index():
+    selection = profiles_listbox.curselection()
+    if not selection:
+        messagebox.showwarning("Внимание", "Выберите профиль в списке.")
+        return None
+    return selection[0]
+
+def load_profile_into_fields():
+    index = selected_profile_index()
+    if index is None: return
+    apply_settings(profiles[index])
+    profile_name_entry.delete(0, tk.END); profile_name_entry.insert(0, profiles[index]['name'])
+
+def delete_profile():
+    index = selected_profile_index()
+    if index is None: return
+    removed = profiles.pop(index)
+    try:
+        config.save_profiles_file(profiles)
+        logging.info(f"Профиль '{removed['name']}' удален.")
+    except Exception as e:
+        logging.exception("Не удалось сохранить профили.")
+        messagebox.showerror("Ошибка", f"Не удалось сохранить профили: {e}")
+    refresh_profiles_listbox()
+
+def on_closing():
+    logging.info("Приложение закрывается.");
+    stop_auto_send()
+    if httpd:
+        httpd.shutdown()
+    root.destroy()
+
+# --- Функции для первоначальной настройки ---
+def save_keys_and_proceed():
+    """Сохраняет введенные ключи в .env и переходит к авторизации."""
+    hh_id = hh_client_id_entry.get()
+    hh_secret = hh_client_secret_entry.get()
+    google_key = google_api_key_entry.get()
+    gender = gender_var.get()
+
+    if not all([hh_id, hh_secret, google_key, gender]):
+        messagebox.showwarning("Ошибка", "Пожалуйста, заполните все поля.")
+        return
+
+    try:
+        if not os.path.exists('.env'):
+            with open('.env', 'w') as f:
+                f.write('')
+        
+        set_key('.env', 'HH_CLIENT_ID', hh_id)
+        set_key('.env', 'HH_CLIENT_SECRET', hh_secret)
+        set_key('.env', 'GOOGLE_API_KEY', google_key)
+        set_key('.env', 'USER_GENDER', gender)
+        set_key('.env', 'HH_REDIRECT_URI', "http://localhost:8080/")
+
+        config.HH_CLIENT_ID = hh_id
+        config.HH_CLIENT_SECRET = hh_secret
+        config.GOOGLE_API_KEY = google_key
+        config.USER_GENDER = gender
+        config.HH_REDIRECT_URI = "http://localhost:8080/"
+        
+        logging.info("Ключи API и пол пользователя успешно сохранены в .env")
+        
+        setup_frame.pack_forget()
+        auth_frame.pack(fill="both", expand=True)
+
+    except Exception as e:
+        messagebox.showerror("Ошибка", f"Не удалось сохранить файл .env: {e}")
+        logging.exception("Ошибка при сохранении .env файла.")
+
+def open_hyperlink(url):
+    webbrowser.open_new(url)
+
+# >>>>> НАЧАЛО НОВОГО БЛОКА <<<<<
+def make_entry_context_menu(entry):
+    """Создает контекстное меню для поля ввода (Вырезать, Копировать, Вставить)."""
+    menu = tk.Menu(entry, tearoff=0)
+    menu.add_command(label="Вырезать", command=lambda: entry.event_generate("<<Cut>>"))
+    menu.add_command(label="Копировать", command=lambda: entry.event_generate("<<Copy>>"))
+    menu.add_command(label="Вставить", command=lambda: entry.event_generate("<<Paste>>"))
+    
+    def show_menu(event):
+        # Показываем меню только если есть что вставлять или выделен текст
+        can_paste = False
+        try:
+            # Проверяем, есть ли текст в буфере обмена
+            if entry.clipboard_get():
+                can_paste = True
+        except tk.TclError:
+            pass # Буфер обмена пуст
+
+        # Активируем/деактивируем пункты меню
+        if entry.selection_present():
+            menu.entryconfig("Вырезать", state="normal")
+            menu.entryconfig("Копировать", state="normal")
+        else:
+            menu.entryconfig("Вырезать", state="disabled")
+            menu.entryconfig("Копировать", state="disabled")
+            
+        if can_paste:
+            menu.entryconfig("Вставить", state="normal")
+        else:
+            menu.entryconfig("Вставить", state="disabled")
+            
+        menu.tk_popup(event.x_root, event.y_root)
+
+    entry.bind("<Button-3>", show_menu) # Привязываем к правой кнопке мыши
+# >>>>> КОНЕЦ НОВОГО БЛОКА <<<<<
+
+# --- Создание GUI ---
+def show_main_window():
+    auth_frame.pack_forget()
+    setup_frame.pack_forget()
+    main_frame.pack(fill="both", expand=True, padx=10, pady=10)
+    threading.Thread(target=load_resumes, daemon=True).start()
+    request_sent_history()
+    root.after(config.SENT_LIST_REFRESH_MS, drain_sent_queue)
+    update_metrics_panel()
+
+# --- Главное окно ---
+root = tk.Tk()
+root.title("HHSearch - несмешной поиск вакансий")
+root.geometry("900x800")
+root.protocol("WM_DELETE_WINDOW", on_closing)
+
+salary_only_var = tk.BooleanVar()
+run_all_profiles_var = tk.BooleanVar()
+gender_var = tk.StringVar()
+
+style = ttk.Style(root)
+style.configure("Green.TLabel", foreground="green", font=("Arial", 10, "bold"))
+style.configure("Red.TLabel", foreground="red", font=("Arial", 10, "bold"))
+style.configure("Link.TLabel", foreground="blue", font=("Arial", 10, "underline"))
+
+# --- Фрейм первоначальной настройки ---
+setup_frame = ttk.Frame(root, padding="20")
+setup_frame.columnconfigure(0, weight=1)
+
+ttk.Label(setup_frame, text="Первоначальная настройка", font=("Arial", 16, "bold")).grid(row=0, column=0, columnspan=2, pady=(0, 20))
+info_label = ttk.Label(setup_frame, wraplength=700, justify="left",
+    text="Для работы приложения необходимо получить ключи API от hh.ru и Google Gemini. "
+         "Это нужно сделать всего один раз. Приложение сохранит ключи в файл .env в своей папке.")
+info_label.grid(row=1, column=0, columnspan=2, pady=(0, 15), sticky="w")
+
+hh_link = ttk.Label(setup_frame, text="1. Получить API ключ от hh.ru (создать приложение)", style="Link.TLabel", cursor="hand2")
+hh_link.grid(row=2, column=0, columnspan=2, pady=5, sticky="w")
+hh_link.bind("<Button-1>", lambda e: open_hyperlink("https://dev.hh.ru/"))
+
+gemini_link = ttk.Label(setup_frame, text="2. Получить API ключ от Google Gemini", style="Link.TLabel", cursor="hand2")
+gemini_link.grid(row=3, column=0, columnspan=2, pady=(5, 20), sticky="w")
+gemini_link.bind("<Button-1>", lambda e: open_hyperlink("https://aistudio.google.com/app/apikey"))
+
+ttk.Label(setup_frame, text="HH.ru Client ID:").grid(row=4, column=0, padx=5, pady=5, sticky="w")
+hh_client_id_entry = ttk.Entry(setup_frame, width=60)
+hh_client_id_entry.grid(row=4, column=1, padx=5, pady=5, sticky="ew")
+
+ttk.Label(setup_frame, text="HH.ru Client Secret:").grid(row=5, column=0, padx=5, pady=5, sticky="w")
+hh_client_secret_entry = ttk.Entry(setup_frame, width=60)
+hh_client_secret_entry.grid(row=5, column=1, padx=5, pady=5, sticky="ew")
+
+ttk.Label(setup_frame, text="Google Gemini API Key:").grid(row=6, column=0, padx=5, pady=5, sticky="w")
+google_api_key_entry = ttk.Entry(setup_frame, width=60)
+google_api_key_entry.grid(row=6, column=1, padx=5, pady=5, sticky="ew")
+
+# >>>>> НАЧАЛО ИЗМЕНЕНИЙ <<<<<
+# Применяем контекстное меню к полям ввода
+make_entry_context_menu(hh_client_id_entry)
+make_entry_context_menu(hh_client_secret_entry)
+make_entry_context_menu(google_api_key_entry)
+# >>>>> КОНЕЦ ИЗМЕНЕНИЙ <<<<<
+
+gender_frame = ttk.Frame(setup_frame)
+gender_frame.grid(row=7, column=0, columnspan=2, pady=10, sticky="w")
+ttk.Label(gender_frame, text="Ваш пол (для корректных писем):").pack(side="left", padx=5)
+ttk.Radiobutton(gender_frame, text="Мужчина", variable=gender_var, value="Мужчина").pack(side="left")
+ttk.Radiobutton(gender_frame, text="Женщина", variable=gender_var, value="Женщина").pack(side="left")
+
+save_button = ttk.Button(setup_frame, text="Сохранить и продолжить", command=save_keys_and_proceed)
+save_button.grid(row=8, column=0, columnspan=2, pady=20, ipady=5)
+
+# --- Фрейм авторизации ---
+auth_frame = ttk.Frame(root, padding="10")
+auth_frame.columnconfigure(0, weight=1)
+ttk.Label(auth_frame, text="Для начала работы необходимо авторизоваться.", font=("Arial", 14)).pack(pady=10)
+ttk.Button(auth_frame, text="Авторизоваться через hh.ru", command=start_server_and_authorize).pack(pady=20, ipady=10)
+
+# --- Главный фрейм ---
+main_frame = ttk.Frame(root, padding="10")
+settings_frame = ttk.Frame(main_frame); settings_frame.pack(fill="x", pady=5)
+left_frame = ttk.Frame(settings_frame); left_frame.pack(side="left", fill="x", expand=True, padx=(0, 5))
+search_frame = ttk.LabelFrame(left_frame, text="Параметры поиска"); search_frame.pack(fill="x", pady=5)
+search_frame.columnconfigure(1, weight=1)
+ttk.Label(search_frame, text="Ключевые слова:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+keyword_entry = ttk.Entry(search_frame); keyword_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+ttk.Label(search_frame, text="Мин. совпадений:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+min_keywords_entry = ttk.Entry(search_frame, width=10); min_keywords_entry.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+min_keywords_entry.insert(0, "1")
+ttk.Label(search_frame, text="Исключить слова:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+exclude_keyword_entry = ttk.Entry(search_frame); exclude_keyword_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+ttk.Label(search_frame, text="Регион (ID):").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+area_entry = ttk.Entry(search_frame); area_entry.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+ttk.Label(search_frame, text="Зарплата от:").grid(row=4, column=0, padx=5, pady=5, sticky="w")
+salary_entry = ttk.Entry(search_frame); salary_entry.grid(row=4, column=1, padx=5, pady=5, sticky="ew")
+ttk.Checkbutton(search_frame, text="Искать только с зарплатой", variable=salary_only_var).grid(row=5, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+ttk.Label(search_frame, text="Глубина поиска (стр):").grid(row=6, column=0, padx=5, pady=5, sticky="w")
+search_depth_entry = ttk.Entry(search_frame, width=10); search_depth_entry.grid(row=6, column=1, padx=5, pady=5, sticky="w")
+search_depth_entry.insert(0, "5")
+ttk.Label(search_frame, text="Режим совпадений:").grid(row=7, column=0, padx=5, pady=5, sticky="w")
+match_mode_combobox = ttk.Combobox(search_frame, state="readonly", values=list(MATCH_MODES)); match_mode_combobox.grid(row=7, column=1, padx=5, pady=5, sticky="w")
+match_mode_combobox.current(0)
+ttk.Label(search_frame, text="Зарплата до:").grid(row=8, column=0, padx=5, pady=5, sticky="w")
+salary_to_entry = ttk.Entry(search_frame); salary_to_entry.grid(row=8, column=1, padx=5, pady=5, sticky="ew")
+ttk.Label(search_frame, text="Исключить работодателей:").grid(row=9, column=0, padx=5, pady=5, sticky="w")
+employer_blacklist_entry = ttk.Entry(search_frame); employer_blacklist_entry.grid(row=9, column=1, padx=5, pady=5, sticky="ew")
+resume_frame = ttk.LabelFrame(left_frame, text="Резюме"); resume_frame.pack(fill="x", pady=5)
+ttk.Label(resume_frame, text="Выберите резюме для откликов:").pack(anchor="w", padx=5, pady=5)
+resume_combobox = ttk.Combobox(resume_frame, state="readonly"); resume_combobox.pack(fill="x", padx=5, pady=5)
+profiles_frame = ttk.LabelFrame(left_frame, text="Профили поиска"); profiles_frame.pack(fill="x", pady=5)
+profiles_listbox = tk.Listbox(profiles_frame, height=4, exportselection=False); profiles_listbox.pack(fill="x", padx=5, pady=5)
+profile_name_frame = ttk.Frame(profiles_frame); profile_name_frame.pack(fill="x", padx=5)
+ttk.Label(profile_name_frame, text="Имя профиля:").pack(side="left")
+profile_name_entry = ttk.Entry(profile_name_frame); profile_name_entry.pack(side="left", fill="x", expand=True, padx=5)
+profile_buttons_frame = ttk.Frame(profiles_frame); profile_buttons_frame.pack(fill="x", padx=5, pady=5)
+ttk.Button(profile_buttons_frame, text="Сохранить как профиль", command=save_profile).pack(side="left")
+ttk.Button(profile_buttons_frame, text="Загрузить в поля", command=load_profile_into_fields).pack(side="left", padx=5)
+ttk.Button(profile_buttons_frame, text="Удалить", command=delete_profile).pack(side="left")
+ttk.Checkbutton(profiles_frame, text="Запускать все профили (иначе - только текущие поля)", variable=run_all_profiles_var).pack(anchor="w", padx=5, pady=(0, 5))
+right_frame = ttk.Frame(settings_frame); right_frame.pack(side="right", fill="both", expand=True, padx=(5, 0))
+sent_list_container = ttk.LabelFrame(right_frame, text="Отправленные отклики"); sent_list_container.pack(fill="both", expand=True)
+sent_tree = ttk.Treeview(sent_list_container, columns=("employer", "vacancy", "time", "status"), show="headings")
+sent_scrollbar = ttk.Scrollbar(sent_list_container, orient="vertical", command=sent_tree.yview)
+for column, title, width in (("employer", "Работодатель", 120), ("vacancy", "Вакансия", 160), ("time", "Время", 110), ("status", "Статус", 90)):
+    sent_tree.heading(column, text=title); sent_tree.column(column, width=width, anchor="w")
+sent_tree.configure(yscrollcommand=on_sent_list_scroll)
+sent_tree.bind("<Double-1>", open_sent_vacancy)
+sent_tree.pack(side="left", fill="both", expand=True); sent_scrollbar.pack(side="right", fill="y")
+metrics_frame = ttk.LabelFrame(right_frame, text="Метрики"); metrics_frame.pack(fill="x", pady=(5, 0))
+metrics_label = ttk.Label(metrics_frame, justify="left", text="Нет данных"); metrics_label.pack(anchor="w", padx=5, pady=5)
+control_frame = ttk.Frame(main_frame); control_frame.pack(fill="x", pady=10)
+ttk.Button(control_frame, text="Сохранить параметры", command=save_settings).pack(side="left", padx=5)
+auto_send_button = ttk.Button(control_frame, text="Запустить автоотправку", command=start_auto_send); auto_send_button.pack(side="left", padx=5)
+status_label = ttk.Label(control_frame, text="Статус: Не запущено", style="Red.TLabel"); status_label.pack(side="left", padx=10, pady=5)
+
+# --- Логика выбора стартового экрана ---
+def run():
+    if all([config.HH_CLIENT_ID, config.HH_CLIENT_SECRET, config.GOOGLE_API_KEY, config.USER_GENDER]):
+        if api.restore_access_token():
+            logging.info("Найден действующий токен доступа. Отображается главное окно.")
+            show_main_window()
+        else:
+            logging.info("Ключи API найдены. Отображается экран авторизации.")
+            auth_frame.pack(fill="both", expand=True)
+    else:
+        logging.info("Один или несколько ключей API не найдены. Отображается экран настройки.")
+        setup_frame.pack(fill="both", expand=True)
+
+    root.mainloop()
\ No newline at end of file
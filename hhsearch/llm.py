@@ -0,0 +1,330 @@
+import re
+import time
+import logging
+import datetime
+import threading
+import collections
+
+from . import config
+from . import metrics
+from .matching import HTML_TAG_RE
+
+# google.generativeai импортируется только при создании генератора: это тяжелая
+# зависимость, и она не нужна, пока движок не начал генерировать письма.
+
+# Категория логов для запросов к LLM по каждой вакансии (см. config.LOG_CATEGORIES)
+llm_log = logging.getLogger("hhsearch.llm")
+
+# Доля TTL кэша контекста, после которой он пересоздается (запас на запросы, начатые перед истечением)
+CONTEXT_CACHE_RENEW_AT = 0.9
+
+# --- Функции для работы с резюме ---
+def format_resume_for_prompt(resume_data):
+    if not resume_data:
+        return ""
+    # (Код этой функции остается без изменений, поэтому скрыт для краткости)
+    formatted_resume = []
+    if resume_data.get('title'):
+        formatted_resume.append(f"Специализация: {resume_data['title']}")
+    experience = resume_data.get('experience', [])
+    if experience:
+        formatted_resume.append("\nОпыт работы:")
+        for exp in experience[:3]:
+            company = exp.get('company', 'Неизвестная компания')
+            position = exp.get('position', 'Неизвестная должность')
+            start_str = exp.get('start')
+            start_date = 'неизвестно'
+            if start_str and isinstance(start_str, str):
+                parts = start_str.split('-')
+                if len(parts) >= 2:
+                    start_date = f"{parts[1]}.{parts[0]}"
+            end_str = exp.get('end')
+            end_date = 'настоящее время'
+            if end_str and isinstance(end_str, str):
+                parts = end_str.split('-')
+                if len(parts) >= 2:
+                    end_date = f"{parts[1]}.{parts[0]}"
+            formatted_resume.append(f"- {position} в {company} ({start_date} - {end_date})")
+            description = exp.get('description', '')
+            if description:
+                clean_description = HTML_TAG_RE.sub('', description).strip()[:200]
+                formatted_resume.append(f"  Обязанности: {clean_description}")
+    skills = resume_data.get('key_skills', [])
+    if skills:
+        skill_names = [skill.get('name', '') for skill in skills[:10]]
+        formatted_resume.append(f"\nКлючевые навыки: {', '.join(skill_names)}")
+    education_data = resume_data.get('education') or {}
+    education = education_data.get('primary', [])
+    if education:
+        formatted_resume.append(f"\nОбразование:")
+        for edu in education[:2]:
+            name = edu.get('name', '')
+            organization = edu.get('organization', '')
+            year = edu.get('year', '')
+            if name and organization:
+                formatted_resume.append(f"- {name}, {organization} ({year})")
+    languages = resume_data.get('language', [])
+    if languages:
+        lang_list = [f"{lang.get('name', '')} ({lang.get('level', {}).get('name', '')})" for lang in languages if lang.get('name') and lang.get('level', {}).get('name')]
+        if lang_list:
+            formatted_resume.append(f"\nЯзыки: {', '.join(lang_list)}")
+    return '\n'.join(formatted_resume)
+
+# --- Функции для работы с LLM ---
+class GenerationScheduler:
+    """Распределяет вызовы LLM в пределах квот запросов (RPM) и токенов (TPM) в минуту.
+
+    Учет ведется по скользящему окну в 60 секунд. Если бюджет исчерпан, вызов
+    ждет освобождения окна, а не завершается ошибкой. После ответа 429 все
+    вызовы приостанавливаются на время, указанное сервером.
+    """
+
+    def __init__(self, rpm=config.LLM_RPM, tpm=config.LLM_TPM, window=60):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self.events = collections.deque()
+        self.blocked_until = 0
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def estimate_tokens(text):
+        return len(text) // config.LLM_CHARS_PER_TOKEN + config.LLM_RESPONSE_TOKENS
+
+    def acquire(self, tokens, stop_event=None):
+        """Резервирует запрос и токены. Возвращает запись для уточнения расхода или None при остановке."""
+        tokens = min(tokens, self.tpm)
+        with self.condition:
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                now = time.monotonic()
+                while self.events and self.events[0][0] <= now - self.window:
+                    self.events.popleft()
+                used_tokens = sum(event[1] for event in self.events)
+                if now >= self.blocked_until and len(self.events) < self.rpm and used_tokens + tokens <= self.tpm:
+                    event = [now, tokens]
+                    self.events.append(event)
+                    return event
+                wait_time = max(self.blocked_until - now, self.events[0][0] + self.window - now if self.events else 0)
+                self.condition.wait(min(max(wait_time, 0.05), 0.5))
+
+    def commit(self, event, actual_tokens):
+        """Заменяет оценку токенов фактическим расходом из ответа модели."""
+        with self.condition:
+            event[1] = actual_tokens
+            self.condition.notify_all()
+
+    def pause(self, seconds):
+        """Приостанавливает все вызовы после ошибки квоты."""
+        with self.condition:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+def parse_retry_delay(error, default):
+    """Извлекает задержку повтора из ошибки квоты Gemini (поле retry_delay или текст 'retry in Ns')."""
+    match = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', str(error)) or re.search(r'retry in ([\d.]+)\s*s', str(error))
+    return float(match.group(1)) if match else default
+
+def call_with_timeout(func, timeout, *args, **kwargs):
+    """Вызывает func в фоновом потоке и ждет результат не дольше timeout секунд.
+
+    Нужен для вызовов SDK Gemini без собственного таймаута (CachedContent.create/delete).
+    По истечении бросает TimeoutError, сам вызов дорабатывает в фоне.
+    """
+    result = {}
+    done = threading.Event()
+
+    def target():
+        try:
+            result['value'] = func(*args, **kwargs)
+        except Exception as e:
+            result['error'] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=target, daemon=True, name="llm-call").start()
+    if not done.wait(timeout):
+        raise TimeoutError(f"нет ответа за {timeout} с")
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+def delete_cached_contents(cached_contents):
+    for cached_content in cached_contents:
+        try:
+            call_with_timeout(cached_content.delete, config.LLM_REQUEST_TIMEOUT)
+        except Exception as e:
+            logging.warning(f"Не удалось удалить кэш контекста: {e}")
+
+class CoverLetterGenerator:
+    """Долгоживущий клиент LLM для генерации сопроводительных писем.
+
+    Клиент и модель создаются один раз за запуск. Системный промпт и
+    отформатированное резюме собираются в префикс один раз на резюме; если модель
+    поддерживает кэширование контекста, префикс загружается в кэш Gemini и в
+    каждом запросе передается только часть, относящаяся к вакансии.
+    """
+
+    def __init__(self, api_key=None, model_name=None, gender=None, use_context_cache=config.LLM_CONTEXT_CACHE):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key or config.GOOGLE_API_KEY)
+        self.genai = genai
+        self.model_name = model_name or config.MODEL_NAME
+        self.gender = gender or config.USER_GENDER
+        self.use_context_cache = use_context_cache
+        self.model = self.genai.GenerativeModel(self.model_name)
+        self.system_prompt = self._build_system_prompt()
+        self.prefixes = {}
+        self.cached_contents = []
+        self.lock = threading.Lock()
+        self.scheduler = GenerationScheduler()
+
+    def _build_system_prompt(self):
+        gender_instruction = ""
+        if self.gender == "Мужчина":
+            gender_instruction = "Обязательно пиши от лица мужчины. Используй глаголы и прилагательные в мужском роде (например, 'выполнил', 'уверен', 'профессиональный')."
+        elif self.gender == "Женщина":
+            gender_instruction = "Обязательно пиши от лица женщины. Используй глаголы и прилагательные в женском роде (например, 'выполнила', 'уверена', 'профессиональная')."
+
+        return (
+            f"Ты - высококлассный специалист по написанию персонализированных сопроводительных писем. {gender_instruction} "
+            "Твоя задача: На основе вакансии и резюме создать сопроводительное письмо от первого лица. "
+            "ЗАПРЕЩЕНО: Придумывать навыки, которых нет в резюме; давать советы; добавлять пояснения; использовать заполнители типа '[Ваше имя]'; включать инструкции. "
+            "ФОРМАТ ОТВЕТА: ТОЛЬКО готовое сопроводительное письмо без каких-либо дополнений. "
+            "ПРИНЦИПЫ: 1. Точность - используй ТОЛЬКО данные из резюме. 2. Релевантность - подчеркивай пересечения между вакансией и резюме. 3. Структура - зацепка, релевантность, ценность, призыв к действию. 4. Краткость: 150-250 слов. "
+            "КРИТИЧЕСКИ ВАЖНО: Твой ответ должен содержать ИСКЛЮЧИТЕЛЬНО готовое к отправке сопроводительное письмо."
+        )
+
+    def _get_prefix(self, resume_data):
+        """Возвращает префикс промпта для версии резюме, собирая его только при первом обращении.
+
+        Текст резюме берется готовым из поля prompt_text (см. api.get_resume_details).
+        """
+        resume_key = (resume_data.get('id'), resume_data.get('updated_at')) if resume_data else None
+        with self.lock:
+            prefix = self.prefixes.get(resume_key)
+            if prefix is None:
+                formatted_resume = resume_data.get('prompt_text') if resume_data else None
+                if formatted_resume is None:
+                    formatted_resume = format_resume_for_prompt(resume_data)
+                resume_info = f"Данные резюме кандидата:\n{formatted_resume}" if formatted_resume else ""
+                prefix = {
+                    'text': f"{self.system_prompt}\n\n{resume_info}" if resume_info else self.system_prompt,
+                    'resume_info': resume_info,
+                    'model': None,
+                    'cached_content': None,
+                    'expires_at': 0.0,
+                    'renewing': False,
+                }
+                self.prefixes[resume_key] = prefix
+            # Кэш контекста Gemini живет LLM_CONTEXT_CACHE_TTL_MINUTES: он пересоздается заранее,
+            # чтобы запросы не ссылались на уже удаленный кэш. Пока он создается, остальные
+            # запросы идут с прежним кэшем или с префиксом в запросе, не дожидаясь блокировки
+            renew = (self.use_context_cache and prefix['resume_info'] and not prefix['renewing']
+                     and time.monotonic() >= prefix['expires_at'])
+            if renew:
+                prefix['renewing'] = True
+        if renew:
+            self._renew_cached_model(prefix)
+        return prefix
+
+    def _renew_cached_model(self, prefix):
+        """Помещает системный промпт и резюме в кэш контекста Gemini.
+
+        Если модель не поддерживает кэширование или Gemini не ответил за LLM_REQUEST_TIMEOUT,
+        prefix['model'] сбрасывается в None и попытка больше не повторяется: префикс
+        передается в каждом запросе.
+        """
+        try:
+            cached_content = call_with_timeout(
+                self.genai.caching.CachedContent.create, config.LLM_REQUEST_TIMEOUT,
+                model=f"models/{self.model_name}",
+                system_instruction=self.system_prompt,
+                contents=[prefix['resume_info']],
+                ttl=datetime.timedelta(minutes=config.LLM_CONTEXT_CACHE_TTL_MINUTES),
+            )
+            model = self.genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+        except Exception as e:
+            logging.warning(f"Кэширование контекста недоступно для модели {self.model_name}, префикс будет передаваться в запросе: {e}")
+            cached_content = model = None
+        with self.lock:
+            if prefix['cached_content'] is not None:
+                self.cached_contents.remove(prefix['cached_content'])
+            if cached_content is not None:
+                self.cached_contents.append(cached_content)
+            prefix['cached_content'], prefix['model'] = cached_content, model
+            prefix['expires_at'] = (float('inf') if cached_content is None else
+                                    time.monotonic() + config.LLM_CONTEXT_CACHE_TTL_MINUTES * 60 * CONTEXT_CACHE_RENEW_AT)
+            prefix['renewing'] = False
+        if cached_content is not None:
+            logging.info(f"Префикс промпта помещен в кэш контекста модели {self.model_name}.")
+
+    def _expire_cached_model(self, prefix):
+        """Помечает кэш контекста префикса истекшим: следующий запрос создаст его заново."""
+        with self.lock:
+            if prefix['expires_at'] != float('inf'):
+                prefix['expires_at'] = 0.0
+
+    @metrics.instrumented("cover_letter")
+    def generate(self, vacancy, resume_data=None, stop_event=None):
+        """Генерирует письмо по нормализованной записи вакансии (см. normalize_vacancy)."""
+        from google.api_core import exceptions as google_exceptions
+        try:
+            prefix = self._get_prefix(resume_data)
+
+            vacancy_info = f"Название: {vacancy['name']}\nКомпания: {vacancy['employer_name']}\nОписание:\n{vacancy['prompt_text']}"
+            vacancy_prompt = f"Вот информация о вакансии:\n\n{vacancy_info}"
+
+            if prefix['model'] is not None:
+                model, prompt = prefix['model'], vacancy_prompt
+            else:
+                model, prompt = self.model, f"{prefix['text']}\n\n{vacancy_prompt}"
+            estimated_tokens = self.scheduler.estimate_tokens(f"{prefix['text']}\n\n{vacancy_prompt}")
+
+            for attempt in range(1, config.LLM_MAX_RETRIES + 2):
+                quota = self.scheduler.acquire(estimated_tokens, stop_event)
+                if quota is None:
+                    return None
+                llm_log.info("Отправка запроса в LLM для вакансии %s...", vacancy['id'])
+                try:
+                    response = model.generate_content(prompt, request_options={'timeout': config.LLM_REQUEST_TIMEOUT})
+                except (google_exceptions.NotFound, google_exceptions.PermissionDenied) as e:
+                    if model is self.model:
+                        raise
+                    # Кэш контекста удален раньше срока: письмо генерируется с префиксом в запросе
+                    logging.warning(f"Кэш контекста недоступен ({e}), префикс передается в запросе.")
+                    self._expire_cached_model(prefix)
+                    model, prompt = self.model, f"{prefix['text']}\n\n{vacancy_prompt}"
+                    continue
+                except (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests) as e:
+                    if attempt > config.LLM_MAX_RETRIES:
+                        raise
+                    retry_delay = parse_retry_delay(e, default=30 * attempt)
+                    logging.warning(f"Превышена квота LLM для вакансии {vacancy['id']}, "
+                                    f"повтор {attempt}/{config.LLM_MAX_RETRIES} через {retry_delay:.0f} с.")
+                    self.scheduler.pause(retry_delay)
+                    continue
+                usage = getattr(response, 'usage_metadata', None)
+                if usage is not None and getattr(usage, 'total_token_count', 0):
+                    self.scheduler.commit(quota, usage.total_token_count)
+                metrics.registry.add('llm_tokens', quota[1])
+                generated_text = response.text
+                llm_log.info("Ответ от LLM для вакансии %s успешно получен.", vacancy['id'])
+                return generated_text
+
+        except Exception as e:
+            logging.exception(f"Ошибка при генерации сопроводительного письма через LLM: {e}")
+            return None
+
+    def close(self):
+        """Удаляет созданные кэши контекста, чтобы не платить за их хранение.
+
+        Удаление идет в фоновом потоке и не задерживает остановку движка. Поток не
+        демонический: при выходе из программы он успевает удалить кэши, но ждет каждый
+        вызов не дольше LLM_REQUEST_TIMEOUT. Неудаленные кэши истекают сами по TTL.
+        """
+        with self.lock:
+            cached_contents = list(self.cached_contents)
+            self.cached_contents.clear()
+        if cached_contents:
+            threading.Thread(target=delete_cached_contents, args=(cached_contents,), name="llm-cache-cleanup").start()
@@ -0,0 +1,150 @@
+import re
+import html
+
+from . import config
+
+# --- Нормализация вакансий ---
+HTML_TAG_RE = re.compile(r'<[^<]+?>')
+HTML_BLOCK_TAG_RE = re.compile(r'<\s*/?\s*(?:br|p|div|ul|ol|h[1-6]|tr)\b[^>]*>', re.IGNORECASE)
+HTML_LIST_ITEM_RE = re.compile(r'<\s*li\b[^>]*>', re.IGNORECASE)
+WORD_RE = re.compile(r'\w+')
+
+def html_to_text(html_text):
+    """Превращает HTML из hh.ru в текст: декодирует сущности, сохраняет абзацы и пункты списков."""
+    text = HTML_LIST_ITEM_RE.sub('\n- ', html_text or '')
+    text = HTML_BLOCK_TAG_RE.sub('\n', text)
+    text = html.unescape(HTML_TAG_RE.sub('', text))
+    lines = (' '.join(line.split()) for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and line != '-')
+
+def normalize_vacancy(details):
+    """Один раз разбирает детали вакансии в компактную запись для всех следующих этапов.
+
+    text - очищенный текст описания со структурой, match_text и tokens - форма
+    для поиска совпадений, prompt_text - усеченное по границе строки описание для LLM.
+    """
+    name = details.get('name') or ''
+    employer = details.get('employer') or {}
+    text = html_to_text(details.get('description', ''))
+    match_text = f"{name}\n{text}".lower()
+
+    prompt_text = text
+    if len(prompt_text) > config.PROMPT_DESCRIPTION_LIMIT:
+        cut = prompt_text.rfind('\n', 0, config.PROMPT_DESCRIPTION_LIMIT)
+        prompt_text = prompt_text[:cut if cut > 0 else config.PROMPT_DESCRIPTION_LIMIT]
+
+    return {
+        'id': details.get('id'),
+        'name': name,
+        'employer_id': str(employer.get('id', '')),
+        'employer_name': employer.get('name', ''),
+        'salary': details.get('salary'),
+        'text': text,
+        'match_text': match_text,
+        'tokens': WORD_RE.findall(match_text),
+        'prompt_text': prompt_text,
+    }
+
+# --- Поиск ключевых слов и стоп-слов ---
+
+# Режимы сравнения слов: подпись в интерфейсе -> код режима
+MATCH_MODES = {
+    "Подстрока": "substring",
+    "Целое слово": "word",
+    "Начало слова": "prefix",
+    "Основа слова": "stem",
+}
+
+# Окончания русских слов, отбрасываемые в режиме "stem" (от длинных к коротким)
+RUSSIAN_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией', 'ий', 'ый', 'ой', 'ей',
+    'ых', 'их', 'ым', 'им',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ом', 'ем', 'ах', 'ях', 'ов', 'ев', 'ам', 'ям', 'ую', 'юю',
+    'ать', 'ять', 'ить', 'еть', 'ть', 'ся', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+def stem_term(term):
+    """Грубо отрезает русские окончания у каждого слова термина, оставляя основу не короче MIN_STEM_LENGTH."""
+    stems = []
+    for word in term.split():
+        if re.search('[а-яё]', word):
+            for ending in RUSSIAN_ENDINGS:
+                if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+                    word = word[:-len(ending)]
+                    break
+        stems.append(word)
+    return ' '.join(stems)
+
+class KeywordMatcher:
+    """Находит все стоп-слова и ключевые слова за один проход по тексту.
+
+    Все термины собираются в одно скомпилированное регулярное выражение (в режиме
+    stem - по одному на каждое число слов в термине) с альтернацией внутри lookahead, поэтому совпадения ищутся в каждой позиции
+    текста, включая перекрывающиеся. Термины, являющиеся префиксом более длинного
+    найденного термина, учитываются через заранее вычисленную таблицу вложений.
+    Режимы: substring - подстрока (как раньше), word - целое слово,
+    prefix - начало слова, stem - основа слова для русской морфологии.
+    """
+
+    def __init__(self, stop_words, keywords, mode="substring"):
+        self.stop_words = list(stop_words)
+        self.keywords = list(keywords)
+        self.mode = mode if mode in MATCH_MODES.values() else "substring"
+
+        # Ключ термина -> исходные термины, которые он представляет. В режиме stem ключ -
+        # кортеж основ слов термина, в остальных режимах - сам термин
+        self.terms = {}
+        for term in self.stop_words + self.keywords:
+            key = tuple(stem_term(term).split()) if self.mode == "stem" else term
+            if key:
+                self.terms.setdefault(key, set()).add(term)
+
+        self.implied = {key: {other for other in self.terms if other != key and self._implies(key, other)}
+                        for key in self.terms}
+
+        # Основа совпадает с началом слова любой длины, поэтому в режиме stem термины с разным
+        # числом слов ищутся отдельными выражениями: в одной позиции текста альтернация
+        # находит только один термин, и однословный не должен теряться за многословным
+        groups = {}
+        for key in self.terms:
+            groups.setdefault(len(key) if self.mode == "stem" else 0, []).append(key)
+        self.regexes = [self._compile(keys) for keys in groups.values()]
+
+    def _implies(self, key, other):
+        """Верно ли, что совпадение термина key в позиции текста означает и совпадение other."""
+        if self.mode == "stem":
+            return (len(other) <= len(key) and other[:-1] == key[:len(other) - 1]
+                    and key[len(other) - 1].startswith(other[-1]))
+        return key.startswith(other) and (self.mode != "word" or not self._is_word_char(key[len(other)]))
+
+    def _compile(self, keys):
+        """Выражение с альтернацией внутри lookahead; номер сработавшей группы указывает на ключ в keys."""
+        keys = sorted(keys, key=lambda key: len(''.join(key)), reverse=True)
+        if self.mode == "stem":
+            patterns = (r'\W+'.join(re.escape(stem) + r'\w*' for stem in key) for key in keys)
+        else:
+            patterns = (re.escape(key) for key in keys)
+        alternation = '|'.join(f'({pattern})' for pattern in patterns)
+        left = r'(?<!\w)' if self.mode != "substring" else ''
+        right = r'(?!\w)' if self.mode == "word" else ''
+        return re.compile(f'{left}(?=(?:{alternation}){right})'), keys
+
+    @staticmethod
+    def _is_word_char(char):
+        return char.isalnum() or char == '_'
+
+    def match(self, text):
+        """Возвращает (найденные стоп-слова, найденные ключевые слова) в порядке их задания."""
+        found = set()
+        for regex, keys in self.regexes:
+            for match in regex.finditer(text):
+                key = keys[match.lastindex - 1]
+                if key not in found:
+                    found.add(key)
+                    found |= self.implied[key]
+        matched_terms = set()
+        for key in found:
+            matched_terms |= self.terms[key]
+        return ([word for word in self.stop_words if word in matched_terms],
+                [word for word in self.keywords if word in matched_terms])
@@ -0,0 +1,222 @@
+"""Метрики движка: время и исход операций, итоги циклов поиска.
+
+Метрики хранятся в памяти процесса. Их можно отдать в формате Prometheus через
+локальный HTTP-эндпоинт (METRICS_PORT) и показать сводкой в GUI.
+"""
+import time
+import logging
+import threading
+import functools
+import contextlib
+import http.server
+
+from . import config
+
+# Границы корзин гистограммы времени операций (в секундах)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Итоги цикла: сколько вакансий увидели, сколько уже были известны, отклонены, отложены
+# при отборе кандидатов, отправлено откликов (и сколько не удалось), сколько токенов LLM потрачено
+CYCLE_TOTALS = ("seen", "known", "rejected", "deferred", "applied", "apply_failed", "llm_tokens")
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Оценка квантиля по корзинам с линейной интерполяцией внутри корзины (как histogram_quantile)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower_bound, lower_count = 0.0, 0
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= rank:
+                in_bucket = count - lower_count
+                return lower_bound + (bound - lower_bound) * ((rank - lower_count) / in_bucket if in_bucket else 1)
+            lower_bound, lower_count = bound, count
+        # Значение выше последней границы: точнее сказать нельзя
+        return self.buckets[-1]
+
+class Metrics:
+    """Потокобезопасный реестр счетчиков и гистограмм времени операций."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}
+        self.results = {}
+        self.totals = dict.fromkeys(CYCLE_TOTALS, 0)
+        self.cycle = dict.fromkeys(CYCLE_TOTALS, 0)
+        self.last_cycle = None
+        self.cycles = 0
+        self.cycle_started = None
+        # Источник состояния ограничителей запросов к hh.ru (см. api.RequestScheduler.snapshot)
+        self.rate_limits = None
+
+    def observe(self, operation, seconds, success=True):
+        with self.lock:
+            self.latency.setdefault(operation, Histogram()).observe(seconds)
+            key = (operation, "success" if success else "error")
+            self.results[key] = self.results.get(key, 0) + 1
+
+    def add(self, total, value=1):
+        """Увеличивает итог текущего цикла и накопленный итог за все время работы."""
+        with self.lock:
+            self.cycle[total] += value
+            self.totals[total] += value
+
+    def start_cycle(self):
+        with self.lock:
+            self.cycle = dict.fromkeys(CYCLE_TOTALS, 0)
+            self.cycle_started = time.monotonic()
+
+    def finish_cycle(self):
+        """Фиксирует итоги завершенного цикла и возвращает их."""
+        with self.lock:
+            self.last_cycle = dict(self.cycle, duration=time.monotonic() - (self.cycle_started or time.monotonic()))
+            self.cycles += 1
+            return dict(self.last_cycle)
+
+    def summary(self):
+        """Сводка для GUI: итоги последнего цикла, накопленные итоги, время операций и скорость запросов к hh.ru."""
+        rate_limits = self.rate_limits() if self.rate_limits else {}
+        with self.lock:
+            operations = {}
+            for operation, histogram in self.latency.items():
+                operations[operation] = {
+                    'count': histogram.count,
+                    'errors': self.results.get((operation, "error"), 0),
+                    'avg': histogram.sum / histogram.count if histogram.count else 0.0,
+                    'p50': histogram.quantile(0.5),
+                    'p95': histogram.quantile(0.95),
+                }
+            return {
+                'cycles': self.cycles,
+                'current_cycle': dict(self.cycle),
+                'last_cycle': dict(self.last_cycle) if self.last_cycle else None,
+                'totals': dict(self.totals),
+                'operations': operations,
+                'rate_limits': rate_limits,
+            }
+
+    def render_prometheus(self):
+        """Текстовый формат экспозиции Prometheus."""
+        lines = []
+        rate_limits = self.rate_limits() if self.rate_limits else {}
+        with self.lock:
+            lines.append("# HELP hhsearch_operation_seconds Время выполнения операций движка.")
+            lines.append("# TYPE hhsearch_operation_seconds histogram")
+            for operation, histogram in sorted(self.latency.items()):
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'hhsearch_operation_seconds_bucket{{operation="{operation}",le="{bound}"}} {count}')
+                lines.append(f'hhsearch_operation_seconds_bucket{{operation="{operation}",le="+Inf"}} {histogram.count}')
+                lines.append(f'hhsearch_operation_seconds_sum{{operation="{operation}"}} {histogram.sum:.6f}')
+                lines.append(f'hhsearch_operation_seconds_count{{operation="{operation}"}} {histogram.count}')
+
+            lines.append("# HELP hhsearch_operations_total Число операций по исходу.")
+            lines.append("# TYPE hhsearch_operations_total counter")
+            for (operation, result), count in sorted(self.results.items()):
+                lines.append(f'hhsearch_operations_total{{operation="{operation}",result="{result}"}} {count}')
+
+            lines.append("# HELP hhsearch_vacancies_total Накопленные итоги по вакансиям и токенам LLM.")
+            lines.append("# TYPE hhsearch_vacancies_total counter")
+            for total, value in self.totals.items():
+                lines.append(f'hhsearch_vacancies_total{{total="{total}"}} {value}')
+
+            lines.append("# HELP hhsearch_cycles_total Число завершенных циклов поиска.")
+            lines.append("# TYPE hhsearch_cycles_total counter")
+            lines.append(f"hhsearch_cycles_total {self.cycles}")
+
+            if self.last_cycle:
+                lines.append("# HELP hhsearch_last_cycle Итоги последнего завершенного цикла.")
+                lines.append("# TYPE hhsearch_last_cycle gauge")
+                for total in CYCLE_TOTALS:
+                    lines.append(f'hhsearch_last_cycle{{total="{total}"}} {self.last_cycle[total]}')
+                lines.append("# TYPE hhsearch_last_cycle_duration_seconds gauge")
+                lines.append(f"hhsearch_last_cycle_duration_seconds {self.last_cycle['duration']:.3f}")
+
+        if rate_limits:
+            lines.append("# HELP hhsearch_rate_limit_rps Текущая разрешенная скорость запросов к hh.ru по классам.")
+            lines.append("# TYPE hhsearch_rate_limit_rps gauge")
+            for endpoint, state in sorted(rate_limits.items()):
+                lines.append(f'hhsearch_rate_limit_rps{{endpoint="{endpoint}"}} {state["rate"]:.3f}')
+            lines.append("# HELP hhsearch_rate_limit_blocked_seconds Сколько секунд класс еще ждет после 429/503.")
+            lines.append("# TYPE hhsearch_rate_limit_blocked_seconds gauge")
+            for endpoint, state in sorted(rate_limits.items()):
+                lines.append(f'hhsearch_rate_limit_blocked_seconds{{endpoint="{endpoint}"}} {state["blocked_for"]:.1f}')
+            lines.append("# HELP hhsearch_throttled_total Число ответов 429/503 от hh.ru по классам запросов.")
+            lines.append("# TYPE hhsearch_throttled_total counter")
+            for endpoint, state in sorted(rate_limits.items()):
+                lines.append(f'hhsearch_throttled_total{{endpoint="{endpoint}"}} {state["throttled"]}')
+        return "\n".join(lines) + "\n"
+
+registry = Metrics()
+
+@contextlib.contextmanager
+def timer(operation):
+    """Замеряет время блока; исключение внутри блока учитывается как ошибка."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        registry.observe(operation, time.perf_counter() - started, success=False)
+        raise
+    registry.observe(operation, time.perf_counter() - started)
+
+def instrumented(operation, success=lambda result: result is not None):
+    """Декоратор: замеряет время вызова, исход определяется по результату функцией success."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                registry.observe(operation, time.perf_counter() - started, success(result))
+        return wrapper
+    return decorator
+
+# --- HTTP-эндпоинт ---
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        return
+
+_server = None
+
+def start_metrics_server(host=None, port=None):
+    """Запускает эндпоинт /metrics в фоновом потоке (один раз). Порт 0 отключает его."""
+    global _server
+    port = config.METRICS_PORT if port is None else port
+    if _server is not None or not port:
+        return _server
+    host = host or config.METRICS_HOST
+    try:
+        _server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logging.error(f"Не удалось запустить эндпоинт метрик на {host}:{port}: {e}")
+        return None
+    threading.Thread(target=_server.serve_forever, daemon=True, name="metrics").start()
+    logging.info(f"Метрики доступны по адресу http://{host}:{port}/metrics")
+    return _server
@@ -0,0 +1,88 @@
+"""Оценка релевантности вакансий резюме и отбор лучших кандидатов цикла.
+
+Кандидаты, прошедшие фильтр, оцениваются одним пакетом: BM25 описания вакансии
+по словам резюме (матрица частот терминов строится в NumPy), плюс бонусы за долю
+совпавших ключевых слов профиля и за указанную зарплату.
+"""
+import numpy as np
+
+from . import config
+from .matching import WORD_RE
+
+# Параметры BM25: насыщение частоты термина и нормализация по длине описания
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Слова короче этого не участвуют в запросе (предлоги, союзы, обрывки)
+MIN_TERM_LENGTH = 3
+
+def query_document(resume_data, keywords=()):
+    """Слова текста резюме для промпта (см. api.get_resume_details) и ключевых слов профиля."""
+    text = (resume_data or {}).get('prompt_text') or ''
+    return [term for term in WORD_RE.findall(f"{text}\n{' '.join(keywords)}".lower()) if len(term) >= MIN_TERM_LENGTH]
+
+def query_terms(resume_data, keywords=()):
+    """Термины запроса: различные слова query_document."""
+    return list(dict.fromkeys(query_document(resume_data, keywords)))
+
+def bm25_scores(documents, terms, k1=BM25_K1, b=BM25_B):
+    """BM25 каждого документа (списка токенов) по терминам запроса. IDF считается по самому пакету.
+
+    Возвращает массив NumPy длины len(documents).
+    """
+    tokens = [token for document in documents for token in document]
+    if not tokens or not terms:
+        return np.zeros(len(documents))
+    lengths = np.fromiter((len(document) for document in documents), dtype=np.float64, count=len(documents))
+    doc_index = np.repeat(np.arange(len(documents)), lengths.astype(np.int64))
+    # Каждое различное слово пакета сопоставляется столбцу запроса (-1, если его нет в запросе)
+    vocabulary, inverse = np.unique(np.array(tokens), return_inverse=True)
+    columns = {term: index for index, term in enumerate(terms)}
+    vocabulary_columns = np.fromiter((columns.get(word, -1) for word in vocabulary), dtype=np.int64, count=len(vocabulary))
+    token_columns = vocabulary_columns[inverse.ravel()]
+    in_query = token_columns >= 0
+
+    tf = np.zeros((len(documents), len(terms)))
+    np.add.at(tf, (doc_index[in_query], token_columns[in_query]), 1)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((len(documents) - df + 0.5) / (df + 0.5))
+    average_length = lengths.mean() or 1.0
+    norm = k1 * (1 - b + b * lengths / average_length)
+    return (tf * (k1 + 1) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+def salary_bonus(salary, salary_min=None):
+    """1 - зарплата указана и не ниже желаемой, доля - если ниже, 0 - не указана или не в рублях."""
+    salary = salary or {}
+    value = salary.get('from') or salary.get('to')
+    if not value or salary.get('currency') != 'RUR':
+        return 0.0
+    return min(value / salary_min, 1.0) if salary_min else 1.0
+
+def score_candidates(items):
+    """Оценивает кандидатов цикла. items - элементы конвейера с полями record, profile и matched_keywords.
+
+    Запрос BM25 строится для каждого профиля (резюме и его ключевые слова). Результат
+    нормируется на оценку самого текста запроса как документа того же пакета: это
+    постоянная точка отсчета, не зависящая от того, насколько хороши кандидаты цикла,
+    поэтому слабая вакансия не получает высокую оценку только потому, что она лучшая
+    у своего профиля. Возвращает массив оценок в порядке items.
+    """
+    if not items:
+        return np.zeros(0)
+    documents = [item['record']['tokens'] for item in items]
+    relevance = np.zeros(len(items))
+    by_profile = {}
+    for index, item in enumerate(items):
+        by_profile.setdefault(item['profile']['name'], []).append(index)
+    for rows in by_profile.values():
+        profile = items[rows[0]]['profile']
+        reference = query_document(profile['resume_data'], profile['settings']['keywords'])
+        scores = bm25_scores(documents + [reference], list(dict.fromkeys(reference)))
+        if scores[-1] > 0:
+            relevance[rows] = np.minimum(scores[rows] / scores[-1], 1.0)
+
+    keywords = np.array([len(item['matched_keywords']) / max(len(item['profile']['settings']['keywords']), 1)
+                         for item in items])
+    salary = np.array([salary_bonus(item['record']['salary'], item['profile']['settings']['salary_min'])
+                       for item in items])
+    weights = config.RANKING_WEIGHTS
+    return weights['relevance'] * relevance + weights['keywords'] * keywords + weights['salary'] * salary
@@ -0,0 +1,611 @@
+import os
+import re
+import json
+import time
+import zlib
+import hashlib
+import logging
+import sqlite3
+import threading
+import collections
+
+from . import config
+
+# --- Функции для работы с файлами ---
+def save_cover_letter(vacancy_id, vacancy_name, letter_text, employer='', resume_id='', model=None):
+    """Сохраняет отправленное сопроводительное письмо в архив писем."""
+    try:
+        get_letter_archive().add(vacancy_id, vacancy_name, letter_text, employer, resume_id, model)
+        logging.info(f"Сопроводительное письмо для вакансии {vacancy_id} сохранено в архив писем.")
+    except Exception as e:
+        logging.exception(f"Не удалось сохранить сопроводительное письмо для вакансии {vacancy_id}: {e}")
+
+def letter_filename(vacancy_id, vacancy_name):
+    """Имя файла письма в прежней раскладке cover_letters/ (по одному файлу на вакансию)."""
+    safe_vacancy_name = re.sub(r'[\/*?:"<>|]', "", vacancy_name or "")
+    return f"vacancy_{vacancy_id}_{safe_vacancy_name}.txt"
+
+def load_token_file(path=config.TOKEN_FILE):
+    """Читает сохраненные токены OAuth. Возвращает None, если файла нет или он поврежден."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logging.exception(f"Не удалось прочитать файл токенов {path}.")
+        return None
+
+def save_token_file(tokens, path=config.TOKEN_FILE):
+    """Атомарно записывает токены OAuth в файл, доступный только владельцу (0600)."""
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(tokens, f)
+    os.replace(tmp_path, path)
+    try:
+        os.chmod(path, 0o600)
+    except OSError:
+        pass
+
+# --- Локальная база данных ---
+def open_database(path=config.DATABASE_FILE):
+    """Открывает SQLite-базу приложения в режиме WAL, пригодном для записи из разных потоков."""
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class VacancyCache:
+    """Дисковый кэш деталей вакансий с TTL и условной ревалидацией по ETag/Last-Modified."""
+
+    def __init__(self, path=config.DATABASE_FILE, ttl_hours=config.VACANCY_CACHE_TTL_HOURS):
+        self.ttl = ttl_hours * 3600
+        self.lock = threading.Lock()
+        self.conn = open_database(path)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS vacancy_cache ("
+                " vacancy_id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " fetched_at REAL NOT NULL)"
+            )
+            self.conn.execute("DELETE FROM vacancy_cache WHERE fetched_at < ?",
+                              (time.time() - config.VACANCY_CACHE_MAX_AGE_DAYS * 86400,))
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
+
+    def get(self, vacancy_id):
+        """Возвращает запись кэша или None. Поле fresh показывает, не истек ли TTL."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT data, etag, last_modified, fetched_at FROM vacancy_cache WHERE vacancy_id = ?",
+                (vacancy_id,)).fetchone()
+        if not row:
+            return None
+        data, etag, last_modified, fetched_at = row
+        return {
+            'data': json.loads(data),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': time.time() - fetched_at < self.ttl,
+        }
+
+    def put(self, vacancy_id, data, etag=None, last_modified=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO vacancy_cache (vacancy_id, data, etag, last_modified, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (vacancy_id, json.dumps(data, ensure_ascii=False), etag, last_modified, time.time()))
+
+    def touch(self, vacancy_id):
+        """Продлевает TTL записи после ответа 304 Not Modified."""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE vacancy_cache SET fetched_at = ? WHERE vacancy_id = ?",
+                              (time.time(), vacancy_id))
+
+    def count(self, kind):
+        with self.lock:
+            self.stats[kind] += 1
+
+    def pop_stats(self):
+        """Возвращает счетчики за прошедший цикл и обнуляет их."""
+        with self.lock:
+            stats = self.stats
+            self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
+        return stats
+
+# Причина записи 'applied' для принятого hh.ru отклика; у неудачных попыток - текст ошибки
+APPLY_SUCCESS_REASON = "Успешно"
+
+class VacancyStateStore:
+    """Индексированное хранилище статусов вакансий (applied/rejected/deferred) в SQLite.
+
+    Проверка принадлежности выполняется запросом по первичному ключу, поэтому
+    история не загружается в память целиком. Отказы копятся в буфере и пишутся
+    пакетом в одной транзакции; отклики сбрасываются на диск сразу.
+    """
+
+    def __init__(self, path=config.DATABASE_FILE, batch_size=config.STATE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.conn = open_database(path)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS vacancy_state ("
+                " vacancy_id TEXT NOT NULL,"
+                " resume_id TEXT NOT NULL DEFAULT '',"
+                " status TEXT NOT NULL,"
+                " reason TEXT,"
+                " vacancy_name TEXT,"
+                " employer TEXT,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (vacancy_id, resume_id))"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_vacancy_state_status ON vacancy_state (status, created_at)")
+
+    def migrate_from_text_files(self, applied_file=config.APPLIED_VACANCIES_FILE, rejected_file=config.REJECTED_VACANCIES_FILE):
+        """Однократно переносит ID из старых текстовых файлов и переименовывает их в *.migrated."""
+        for filename, status in ((applied_file, 'applied'), (rejected_file, 'rejected')):
+            if not os.path.exists(filename):
+                continue
+            try:
+                created_at = os.path.getmtime(filename)
+                with open(filename, "r") as f:
+                    rows = [(line.strip(), status, 'перенесено из ' + filename, created_at) for line in f if line.strip()]
+                with self.lock, self.conn:
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO vacancy_state (vacancy_id, resume_id, status, reason, created_at)"
+                        " VALUES (?, '', ?, ?, ?)", rows)
+                os.replace(filename, filename + ".migrated")
+                logging.info(f"Перенесено {len(rows)} ID из файла {filename} в базу {config.DATABASE_FILE}.")
+            except Exception as e:
+                logging.exception(f"Ошибка при переносе файла {filename}: {e}")
+
+    def known_statuses(self, vacancy_ids, resume_id=''):
+        """Возвращает {vacancy_id: status} для уже обработанных вакансий из переданного списка.
+
+        Отклик учитывается для любого резюме, отказ - только для этого резюме
+        или для записей без резюме (перенесенных из старых файлов).
+        """
+        vacancy_ids = list(vacancy_ids)
+        if not vacancy_ids:
+            return {}
+        placeholders = ','.join('?' * len(vacancy_ids))
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT vacancy_id, status FROM vacancy_state WHERE vacancy_id IN ({placeholders})"
+                " AND (status = 'applied' OR resume_id IN (?, ''))",
+                (*vacancy_ids, resume_id)).fetchall()
+            pending = [(key[0], record[0]) for key, record in self.pending.items()
+                       if key[0] in vacancy_ids and (record[0] == 'applied' or key[1] in (resume_id, ''))]
+        statuses = {}
+        for vacancy_id, status in rows + pending:
+            if statuses.get(vacancy_id) != 'applied':
+                statuses[vacancy_id] = status
+        return statuses
+
+    def record(self, vacancy_id, status, resume_id='', reason='', vacancy_name='', employer=''):
+        with self.lock:
+            self.pending[(vacancy_id, resume_id)] = (status, reason, vacancy_name, employer, time.time())
+            should_flush = status == 'applied' or len(self.pending) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные статусы одной транзакцией."""
+        with self.lock:
+            if not self.pending:
+                return
+            rows = [(vacancy_id, resume_id, *record) for (vacancy_id, resume_id), record in self.pending.items()]
+            try:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO vacancy_state"
+                        " (vacancy_id, resume_id, status, reason, vacancy_name, employer, created_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self.pending.clear()
+            except sqlite3.Error:
+                logging.exception(f"Не удалось сохранить {len(rows)} статусов вакансий в базу.")
+                return
+        logging.info(f"Сохранено {len(rows)} статусов вакансий в базу.")
+
+    def count_applied_since(self, since):
+        """Число успешных откликов, отправленных после момента since.
+
+        Неудачные попытки не учитываются, как и записи, перенесенные из текстовых файлов
+        (их причина - 'перенесено из ...', а время - время изменения файла).
+        """
+        self.flush()
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM vacancy_state"
+                                     " WHERE status = 'applied' AND reason = ? AND created_at >= ?",
+                                     (APPLY_SUCCESS_REASON, since)).fetchone()[0]
+
+    def deferred(self, since):
+        """Строки (vacancy_id, resume_id, vacancy_name) вакансий, отложенных при отборе кандидатов после момента since."""
+        self.flush()
+        with self.lock:
+            return self.conn.execute("SELECT vacancy_id, resume_id, vacancy_name FROM vacancy_state"
+                                     " WHERE status = 'deferred' AND created_at >= ?",
+                                     (since,)).fetchall()
+
+    def applied_history(self, before=None, limit=config.SENT_HISTORY_PAGE_SIZE):
+        """Возвращает страницу истории откликов от новых к старым.
+
+        before - пара (created_at, vacancy_id) последней уже показанной записи (для подгрузки
+        следующей страницы). vacancy_id различает записи с одинаковым временем: у перенесенных
+        из текстовых файлов оно общее.
+        Строки: (vacancy_id, vacancy_name, employer, reason, created_at).
+        """
+        created_at, vacancy_id = before or (float('inf'), '')
+        with self.lock:
+            return self.conn.execute(
+                "SELECT vacancy_id, vacancy_name, employer, reason, created_at FROM vacancy_state"
+                " WHERE status = 'applied' AND (created_at < ? OR (created_at = ? AND vacancy_id < ?))"
+                " ORDER BY created_at DESC, vacancy_id DESC LIMIT ?",
+                (created_at, created_at, vacancy_id, limit)).fetchall()
+
+class SearchWatermarkStore:
+    """Водяные знаки поиска: время публикации самой новой вакансии, увиденной профилем.
+
+    Знак хранится вместе с подписью запроса поиска и сбрасывается, если параметры
+    профиля изменились, чтобы новый запрос не пропустил старые вакансии.
+    """
+
+    def __init__(self, path=config.DATABASE_FILE):
+        self.lock = threading.Lock()
+        self.conn = open_database(path)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_watermarks ("
+                " profile TEXT PRIMARY KEY,"
+                " query TEXT NOT NULL,"
+                " published_at TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def get(self, profile, query):
+        """Возвращает сохраненный published_at профиля или None, если знака нет или запрос изменился."""
+        with self.lock:
+            row = self.conn.execute("SELECT query, published_at FROM search_watermarks WHERE profile = ?",
+                                    (profile,)).fetchone()
+        if not row or row[0] != query:
+            return None
+        return row[1]
+
+    def set(self, profile, query, published_at):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO search_watermarks (profile, query, published_at, updated_at)"
+                " VALUES (?, ?, ?, ?)", (profile, query, published_at, time.time()))
+
+class ResumeCache:
+    """Дисковый кэш резюме с TTL: исходный JSON hh.ru, его updated_at и готовый текст для промпта LLM."""
+
+    def __init__(self, path=config.DATABASE_FILE, ttl_hours=config.RESUME_CACHE_TTL_HOURS):
+        self.ttl = ttl_hours * 3600
+        self.lock = threading.Lock()
+        self.conn = open_database(path)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS resume_cache ("
+                " resume_id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " updated_at TEXT,"
+                " prompt_text TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL)"
+            )
+
+    def get(self, resume_id):
+        """Возвращает запись кэша или None. В data добавлено поле prompt_text, fresh показывает, не истек ли TTL."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT data, updated_at, prompt_text, fetched_at FROM resume_cache WHERE resume_id = ?",
+                (resume_id,)).fetchone()
+        if not row:
+            return None
+        data, updated_at, prompt_text, fetched_at = row
+        return {
+            'data': dict(json.loads(data), prompt_text=prompt_text),
+            'updated_at': updated_at,
+            'fresh': time.time() - fetched_at < self.ttl,
+        }
+
+    def put(self, resume_id, data, prompt_text):
+        data = {key: value for key, value in data.items() if key != 'prompt_text'}
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO resume_cache (resume_id, data, updated_at, prompt_text, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (resume_id, json.dumps(data, ensure_ascii=False), data.get('updated_at'), prompt_text, time.time()))
+
+    def touch(self, resume_id):
+        """Продлевает TTL записи: hh.ru подтвердил, что резюме не менялось."""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE resume_cache SET fetched_at = ? WHERE resume_id = ?", (time.time(), resume_id))
+
+class LetterCache:
+    """LRU-кэш сопроводительных писем по отпечатку содержимого вакансии.
+
+    Работодатели часто публикуют одно и то же описание под разными ID (другие
+    города, перепубликации). Отпечаток строится из версии резюме, ID работодателя,
+    названия и очищенного описания, поэтому такие вакансии получают готовое
+    письмо без обращения к LLM. Кэш хранится в JSON-файле рядом с COVER_LETTERS_DIR.
+    """
+
+    def __init__(self, path=config.LETTER_CACHE_FILE, max_size=config.LETTER_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.dirty = False
+        self.stats = {'hits': 0, 'misses': 0}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries.update(json.load(f))
+            logging.info(f"Загружено {len(self.entries)} писем из кэша {self.path}.")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.exception(f"Не удалось загрузить кэш писем {self.path}: {e}")
+
+    @staticmethod
+    def fingerprint(resume_id, vacancy):
+        """Отпечаток нормализованной вакансии: регистр, разметка и пунктуация не учитываются."""
+        parts = (str(resume_id or ''), vacancy['employer_id'], ' '.join(vacancy['tokens']))
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            letter = self.entries.get(key)
+            if letter is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return letter
+
+    def put(self, key, letter):
+        with self.lock:
+            self.entries[key] = letter
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def save(self):
+        """Атомарно записывает кэш на диск, если он изменился."""
+        # Сохранять могут и конвейер, и брошенные при остановке потоки генерации: запись по очереди
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                snapshot = dict(self.entries)
+                self.dirty = False
+            try:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logging.exception(f"Не удалось сохранить кэш писем {self.path}: {e}")
+
+    def pop_stats(self):
+        with self.lock:
+            stats = self.stats
+            self.stats = {'hits': 0, 'misses': 0}
+        return stats
+
+class LetterArchive:
+    """Архив отправленных сопроводительных писем в базе SQLite.
+
+    Вместо тысяч файлов в COVER_LETTERS_DIR каждое письмо хранится одной строкой
+    (вакансия, работодатель, резюме, модель, время) с телом, сжатым zlib. Поиск
+    по тексту, названию вакансии и работодателю идет через индекс FTS5; если
+    SQLite собран без FTS5, используется медленный поиск перебором.
+    """
+
+    def __init__(self, path=config.DATABASE_FILE, compress=config.LETTER_ARCHIVE_COMPRESS):
+        self.compress = compress
+        self.lock = threading.Lock()
+        self.conn = open_database(path)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cover_letters ("
+                " id INTEGER PRIMARY KEY,"
+                " vacancy_id TEXT NOT NULL,"
+                " vacancy_name TEXT NOT NULL DEFAULT '',"
+                " employer TEXT NOT NULL DEFAULT '',"
+                " resume_id TEXT NOT NULL DEFAULT '',"
+                " model TEXT,"
+                " created_at REAL NOT NULL,"
+                " compressed INTEGER NOT NULL,"
+                " body BLOB NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS cover_letters_vacancy ON cover_letters (vacancy_id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS cover_letters_created ON cover_letters (created_at)")
+            # Отметки о выполненном переносе писем из папок старой раскладки
+            self.conn.execute("CREATE TABLE IF NOT EXISTS cover_letters_migrations (directory TEXT PRIMARY KEY, migrated_at REAL NOT NULL)")
+            try:
+                # Индекс без собственной копии текста: тела писем хранятся только сжатыми в cover_letters
+                self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS cover_letters_fts"
+                                  " USING fts5(letter, vacancy_name, employer, content='')")
+                self.fts = True
+            except sqlite3.OperationalError as e:
+                logging.warning(f"SQLite без поддержки FTS5, поиск по архиву писем будет медленным: {e}")
+                self.fts = False
+
+    def _encode(self, text):
+        data = text.encode("utf-8")
+        return (1, zlib.compress(data)) if self.compress else (0, data)
+
+    @staticmethod
+    def _decode(compressed, body):
+        return (zlib.decompress(body) if compressed else bytes(body)).decode("utf-8")
+
+    def _insert(self, vacancy_id, vacancy_name, letter_text, employer, resume_id, model, created_at):
+        compressed, body = self._encode(letter_text)
+        cursor = self.conn.execute(
+            "INSERT INTO cover_letters (vacancy_id, vacancy_name, employer, resume_id, model, created_at, compressed, body)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(vacancy_id), vacancy_name or '', employer or '', resume_id or '', model, created_at, compressed, body))
+        if self.fts:
+            self.conn.execute("INSERT INTO cover_letters_fts (rowid, letter, vacancy_name, employer) VALUES (?, ?, ?, ?)",
+                              (cursor.lastrowid, letter_text, vacancy_name or '', employer or ''))
+
+    def add(self, vacancy_id, vacancy_name, letter_text, employer='', resume_id='', model=None, created_at=None):
+        with self.lock, self.conn:
+            self._insert(vacancy_id, vacancy_name, letter_text, employer, resume_id, model, created_at or time.time())
+
+    @staticmethod
+    def _fts_phrase(text):
+        return '"' + text.replace('"', '""') + '"'
+
+    def search(self, text='', employer='', limit=50):
+        """Письма, в тексте или названии вакансии которых есть все слова text, а в имени
+        работодателя - фраза employer (по началу слов). Новые письма первыми."""
+        words = text.split()
+        employer = employer.strip()
+        with self.lock:
+            if self.fts and (words or employer):
+                terms = [f"{{letter vacancy_name}} : {self._fts_phrase(word)}" for word in words]
+                if employer:
+                    terms.append(f"employer : {self._fts_phrase(employer)} *")
+                rows = self.conn.execute(
+                    "SELECT c.vacancy_id, c.vacancy_name, c.employer, c.resume_id, c.model, c.created_at, c.compressed, c.body"
+                    " FROM cover_letters_fts JOIN cover_letters c ON c.id = cover_letters_fts.rowid"
+                    " WHERE cover_letters_fts MATCH ? ORDER BY c.created_at DESC LIMIT ?",
+                    (' AND '.join(terms), limit)).fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT vacancy_id, vacancy_name, employer, resume_id, model, created_at, compressed, body"
+                    " FROM cover_letters WHERE employer LIKE ? ORDER BY created_at DESC",
+                    (f"%{employer}%",)).fetchall()
+        letters = []
+        for vacancy_id, vacancy_name, employer_name, resume_id, model, created_at, compressed, body in rows:
+            letter = self._decode(compressed, body)
+            if not self.fts:
+                haystack = f"{letter} {vacancy_name}".lower()
+                if not all(word.lower() in haystack for word in words):
+                    continue
+            letters.append({'vacancy_id': vacancy_id, 'vacancy_name': vacancy_name, 'employer': employer_name,
+                            'resume_id': resume_id, 'model': model, 'created_at': created_at, 'letter': letter})
+            if len(letters) >= limit:
+                break
+        return letters
+
+    def export(self, directory=config.COVER_LETTERS_DIR):
+        """Выгружает архив в прежнюю раскладку: по файлу vacancy_<id>_<название>.txt на вакансию.
+
+        Если на вакансию отправлено несколько писем (разными резюме), в файле остается последнее.
+        Возвращает число записанных файлов.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT vacancy_id, vacancy_name, created_at, compressed, body FROM cover_letters ORDER BY created_at").fetchall()
+        written = set()
+        for vacancy_id, vacancy_name, created_at, compressed, body in rows:
+            filename = os.path.join(directory, letter_filename(vacancy_id, vacancy_name))
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(self._decode(compressed, body))
+            os.utime(filename, (created_at, created_at))
+            written.add(filename)
+        logging.info(f"Выгружено {len(written)} писем из архива в папку {directory}.")
+        return len(written)
+
+    def migrate_from_directory(self, directory=config.COVER_LETTERS_DIR):
+        """Однократно переносит письма из файлов старой раскладки и переименовывает папку в *.migrated.
+
+        Перенос отмечается в базе, поэтому папка, созданная позже выгрузкой (--export-letters),
+        повторно не разбирается. Письма вакансий, которые уже есть в архиве, не дублируются.
+        """
+        if not os.path.isdir(directory):
+            return
+        key = os.path.abspath(directory)
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM cover_letters_migrations WHERE directory = ?", (key,)).fetchone():
+                return
+        if os.path.exists(directory + ".migrated"):
+            # Перенос выполнен версией без отметок в базе, папка появилась после выгрузки
+            with self.lock, self.conn:
+                self.conn.execute("INSERT OR IGNORE INTO cover_letters_migrations VALUES (?, ?)", (key, time.time()))
+            return
+        pattern = re.compile(r'^vacancy_([^_]+)_(.*)\.txt$')
+        imported = 0
+        try:
+            with self.lock, self.conn:
+                self.conn.execute("INSERT OR IGNORE INTO cover_letters_migrations VALUES (?, ?)", (key, time.time()))
+                for entry in os.scandir(directory):
+                    match = pattern.match(entry.name)
+                    if not match or not entry.is_file():
+                        continue
+                    vacancy_id, vacancy_name = match.groups()
+                    if self.conn.execute("SELECT 1 FROM cover_letters WHERE vacancy_id = ? LIMIT 1", (vacancy_id,)).fetchone():
+                        continue
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        letter_text = f.read()
+                    self._insert(vacancy_id, vacancy_name, letter_text, '', '', None, entry.stat().st_mtime)
+                    imported += 1
+            os.replace(directory, directory + ".migrated")
+            logging.info(f"Перенесено {imported} писем из папки {directory} в архив {config.DATABASE_FILE}.")
+        except Exception as e:
+            logging.exception(f"Ошибка при переносе писем из папки {directory}: {e}")
+
+# Общие экземпляры хранилищ создаются при первом обращении, чтобы импорт модуля
+# не открывал базу и не читал файлы
+_vacancy_cache = None
+_state_store = None
+_letter_cache = None
+_letter_archive = None
+_resume_cache = None
+_watermark_store = None
+_instances_lock = threading.Lock()
+
+def get_vacancy_cache():
+    global _vacancy_cache
+    with _instances_lock:
+        if _vacancy_cache is None:
+            _vacancy_cache = VacancyCache()
+        return _vacancy_cache
+
+def get_state_store():
+    global _state_store
+    with _instances_lock:
+        if _state_store is None:
+            _state_store = VacancyStateStore()
+            _state_store.migrate_from_text_files()
+        return _state_store
+
+def get_letter_cache():
+    global _letter_cache
+    with _instances_lock:
+        if _letter_cache is None:
+            _letter_cache = LetterCache()
+        return _letter_cache
+
+def get_letter_archive():
+    global _letter_archive
+    with _instances_lock:
+        if _letter_archive is None:
+            _letter_archive = LetterArchive()
+            _letter_archive.migrate_from_directory()
+        return _letter_archive
+
+def get_resume_cache():
+    global _resume_cache
+    with _instances_lock:
+        if _resume_cache is None:
+            _resume_cache = ResumeCache()
+        return _resume_cache
+
+def get_watermark_store():
+    global _watermark_store
+    with _instances_lock:
+        if _watermark_store is None:
+            _watermark_store = SearchWatermarkStore()
+        return _watermark_store
@@ -0,0 +1,24 @@
+import unittest
+
+from hhsearch.matching import KeywordMatcher
+
+class KeywordMatcherStemTest(unittest.TestCase):
+    TEXT = "Требуется разработчик Python. Удаленной работы нет, зато много машинного обучения."
+
+    def test_multi_word_terms_in_stem_mode(self):
+        matcher = KeywordMatcher(["удаленная работа"], ["python", "разработчик", "машинное обучение"], "stem")
+        self.assertEqual(matcher.match(self.TEXT.lower()),
+                         (["удаленная работа"], ["python", "разработчик", "машинное обучение"]))
+
+    def test_single_word_stem_is_not_hidden_by_multi_word_term(self):
+        matcher = KeywordMatcher([], ["машинное обучение", "машинист", "обучение"], "stem")
+        self.assertEqual(matcher.match(self.TEXT.lower()), ([], ["машинное обучение", "обучение"]))
+
+    def test_other_modes_find_multi_word_terms(self):
+        text = "удаленная работа, машинное обучение"
+        for mode in ("substring", "word", "prefix"):
+            matcher = KeywordMatcher(["удаленная работа"], ["машинное обучение"], mode)
+            self.assertEqual(matcher.match(text), (["удаленная работа"], ["машинное обучение"]), mode)
+
+if __name__ == "__main__":
+    unittest.main()